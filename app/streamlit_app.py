@@ -1,15 +1,21 @@
 import streamlit as st
 import sys
 import os
-from notes_formatter import NotesFormatter
-import tempfile
-import os as os_sys
+import time
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from content_generator import ContentGenerator
-from example_generator import ExampleGenerator
-from quiz_generator import QuizGenerator
+from generation.artifacts import export_key, get_default_artifact_store
+from generation.notes_formatter import NotesFormatter
+from generation.content_generator import ContentGenerator
+from generation.example_generator import ExampleGenerator
+from generation.quize_generator import QuizGenerator
+from generation import metrics
+from generation.metrics import logger
+from generation.bundle_generator import BundleGenerator
+from generation.jobs import DEFAULT_MAX_WORKERS, JobQueue, QueueFullError
+from generation.pipeline import SECTIONS, StudyMaterialPipeline
+from generation.prefetch import Prefetcher
 
 st.set_page_config(
     page_title="AI Study Material Generator",
@@ -18,17 +24,101 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+metrics.configure_logging()
+
 
 @st.cache_resource
 def load_generators():
-    return {
+    generators = {
         "content": ContentGenerator(),
         "example": ExampleGenerator(),
         "quiz": QuizGenerator()
     }
+    generators["bundle"] = BundleGenerator(generators["content"], generators["example"], generators["quiz"])
+    return generators
+
+
+@st.cache_resource
+def load_pipeline():
+    # Every running job can generate all of its sections at once
+    return StudyMaterialPipeline(load_generators(), max_workers=DEFAULT_MAX_WORKERS * len(SECTIONS))
+
+
+@st.cache_resource
+def load_prefetcher():
+    """Background prefetcher when enabled with STUDY_PREFETCH=1 and a GROQ_RPM or GROQ_TPM budget, else None"""
+    if os.environ.get("STUDY_PREFETCH") != "1":
+        return None
+    prefetcher = Prefetcher(load_generators())
+    if not prefetcher.limiter.buckets:
+        logger.warning("STUDY_PREFETCH=1 is ignored without a GROQ_RPM or GROQ_TPM rate budget")
+        return None
+    # Warm the cache for popular topics at startup, then every STUDY_WARMUP_INTERVAL seconds
+    prefetcher.start_schedule(float(os.environ.get("STUDY_WARMUP_INTERVAL", 6 * 60 * 60)))
+    return prefetcher
+
+
+@st.cache_resource
+def load_jobs():
+    return JobQueue(load_pipeline(), load_generators()["bundle"], prefetcher=load_prefetcher())
+
+
+jobs = load_jobs()
+
+# Seconds between progress checks while a job is running
+POLL_INTERVAL = 0.5
+
+
+def render_preview(section, value):
+    """Render a finished section while the others are still generating"""
+    if section == "content":
+        st.markdown("### 📝 Structured Explanation")
+        st.write(value)
+    elif section == "examples" and value:
+        st.markdown("### 💡 Real-World Examples")
+        st.info(value)
+    elif section == "quiz" and value:
+        st.markdown("### ❓ Quiz")
+        # Questions arrive one at a time while the quiz streams
+        for i, q in enumerate(value, 1):
+            st.markdown(f"**Question {i}:** {q['question']}")
+
+
+def show_job(job_id):
+    """Switch the page to job_id, keeping it in the URL so a browser refresh picks it up again"""
+    st.session_state.job_id = job_id
+    st.session_state.pop("study_material", None)
+    st.experimental_set_query_params(job=job_id)
 
 
-generators = load_generators()
+def load_sections(material):
+    """Look up a session's sections in the shared artifact store, reloading them from the job if evicted"""
+    store = get_default_artifact_store()
+    sections = {name: store.get(artifact["hash"]) for name, artifact in material["artifacts"].items()}
+    if any(value is None for value in sections.values()):
+        job = jobs.get(material["job_id"])
+        if job is None:
+            return None
+        sections = job["sections"]
+        for value in sections.values():
+            store.put(value)
+    return sections
+
+
+def regenerate_button(section, data):
+    """Button that regenerates one section as a new job reusing the others"""
+    version = data["artifacts"].get(section, {}).get("version", 1)
+    if st.button("🔄 Regenerate", key=f"regenerate_{section}", help=f"Version {version}"):
+        try:
+            new_job_id = jobs.submit_section(data["job_id"], section)
+        except QueueFullError as e:
+            st.error(str(e))
+        else:
+            if new_job_id is None:
+                st.error("This material has expired, please generate it again.")
+            else:
+                show_job(new_job_id)
+                st.rerun()
 
 st.title("AI Study Material Generator")
 st.write("Structured explanation • Difficulty-specific content • Real-world examples • Quiz")
@@ -47,92 +137,131 @@ with col_examples:
 with col_quiz:
     show_quiz = st.checkbox("Include Quiz", value=True)
 
-# Clean up previous PDF if exists
-if "study_material" in st.session_state:
-    prev_data = st.session_state.study_material
-    if prev_data.get("pdf_file") and os.path.exists(prev_data["pdf_file"]):
-        try:
-            os_sys.remove(prev_data["pdf_file"])
-        except:
-            pass  # Ignore errors during cleanup
+bundle_mode = st.sidebar.checkbox(
+    "Single request mode",
+    value=os.environ.get("STUDY_BUNDLE_MODE") == "1",
+    help="Generate all sections with one API call. Useful on request-limited API tiers."
+)
+show_debug = st.sidebar.checkbox("Show debug panel", value=False)
 
 if generate_button:
     if not topic.strip():
         st.error("Please enter a topic.")
     else:
-        content = generators["content"].generate_content(topic, level)
-        examples = generators["example"].generate_examples(topic, level) if show_examples else ""
-        quiz_data = generators["quiz"].generate_quiz(topic, level) if show_quiz else []
-
-        # Generate PDF in temporary file
-        temp_pdf_filename = f"temp_study_material_{topic.replace(' ', '_')}_{level}.pdf"
-        pdf_success = NotesFormatter.export_to_pdf(
-            topic,
-            level,
-            content,
-            examples,
-            quiz_data,
-            temp_pdf_filename
-        )
-        
+        # Generation runs in a background job; this script run only polls it
+        try:
+            job_id = jobs.submit(topic, level, show_examples, show_quiz, bundle_mode)
+        except QueueFullError as e:
+            st.error(str(e))
+        else:
+            show_job(job_id)
+
+job_id = st.session_state.get("job_id") or st.experimental_get_query_params().get("job", [None])[0]
+if job_id and st.session_state.get("loaded_job") != job_id:
+    job = jobs.get(job_id)
+    if job is None:
+        st.session_state.pop("job_id", None)
+    elif jobs.is_stale(job):
+        # The worker that owned the job is gone, so polling would never end
+        st.error("Generation stopped unexpectedly, please try again.")
+        st.session_state.loaded_job = job_id
+    elif job["status"] in ("queued", "running"):
+        st.subheader(f"{job['topic']} ({job['level']})")
+        st.caption("Waiting for a free worker..." if job["status"] == "queued" else "Generating...")
+        for section in SECTIONS:
+            value = job["sections"].get(section, job["partial"].get(section))
+            if value:
+                render_preview(section, value)
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"Generation failed: {job['error']}")
+        st.session_state.loaded_job = job_id
+    else:
+        # Sessions keep only keys; the section values are shared by every session through the store
+        store = get_default_artifact_store()
+        for value in job["sections"].values():
+            store.put(value)
         st.session_state.study_material = {
-            "topic": topic,
-            "level": level,
-            "content": content,
-            "examples": examples,
-            "quiz": quiz_data,
-            "pdf_file": temp_pdf_filename if pdf_success else None,
+            "job_id": job_id,
+            "topic": job["topic"],
+            "level": job["level"],
+            "artifacts": job["artifacts"],
         }
+        st.session_state.debug_trace = job["trace"]
+        st.session_state.loaded_job = job_id
+        # The PDF is only offered once a download is requested
+        st.session_state.pdf_requested = False
 
-if "study_material" in st.session_state:
-    data = st.session_state.study_material
+sections = load_sections(st.session_state.study_material) if "study_material" in st.session_state else None
+if "study_material" in st.session_state and sections is None:
+    st.error("This material has expired, please generate it again.")
+    st.session_state.pop("study_material")
+
+if sections is not None:
+    data = dict(st.session_state.study_material, **sections)
 
     st.subheader(f"{data['topic']} ({data['level']})")
+    # Exports are stored by the section hashes, so only changed sections cause a re-render
+    key = export_key(data["topic"], data["level"], data["artifacts"])
 
     # PDF Download Section
     col1, col2 = st.columns([1, 1])
     with col1:
-        if data.get("pdf_file") and os.path.exists(data["pdf_file"]):
-            with open(data["pdf_file"], 'rb') as f:
-                pdf_data = f.read()
-            st.download_button(
-                label="📥 Download as PDF",
-                data=pdf_data,
-                file_name=f"{data['topic'].replace(' ', '_')}_{data['level']}_Study_Material.pdf",
-                mime="application/pdf"
+        if st.session_state.get("pdf_requested"):
+            # Shared through the artifact store; on a miss the job's pre-rendered PDF is used if it has one
+            pdf_data = NotesFormatter.render_pdf(
+                data["topic"], data["level"], data["content"], data["examples"], data["quiz"],
+                key=key, stored=lambda: jobs.get_pdf(data["job_id"])
             )
-        else:
-            st.info("PDF not available")
+            if pdf_data:
+                st.download_button(
+                    label="📥 Download as PDF",
+                    data=pdf_data,
+                    file_name=f"{data['topic'].replace(' ', '_')}_{data['level']}_Study_Material.pdf",
+                    mime="application/pdf"
+                )
+            else:
+                st.info("PDF not available")
+        elif st.button("📄 Prepare PDF"):
+            st.session_state.pdf_requested = True
+            st.rerun()
 
     with col2:
         st.download_button(
             label="📝 Download as Markdown",
-            data=NotesFormatter.format_markdown(data['content'], data['examples'], data['quiz']),
+            data=NotesFormatter.render_markdown(
+                data['topic'], data['level'], data['content'], data['examples'], data['quiz'], key=key
+            ),
             file_name=f"{data['topic'].replace(' ', '_')}_{data['level']}_Study_Material.md",
             mime="text/markdown"
         )
 
     st.markdown("### 📝 Structured Explanation")
     st.write(data["content"])
+    regenerate_button("content", data)
 
     st.markdown("### 💡 Real-World Examples")
     if data["examples"]:
         st.info(data["examples"])
     else:
         st.info("Examples not generated. Enable them above.")
+    regenerate_button("examples", data)
 
     st.markdown("### ❓ Quiz")
     if data["quiz"]:
+        # Widget keys include the quiz version so a regenerated quiz starts with fresh answers
+        quiz_version = data["artifacts"]["quiz"]["version"]
         for i, q in enumerate(data["quiz"], 1):
             st.markdown(f"**Question {i}:** {q['question']}")
 
             user_answer = st.radio(
                 f"Select your answer for Q{i}",
                 options=q["options"],
-                key=f"q_{i}"
+                key=f"q_{quiz_version}_{i}"
             )
 
-            if st.button(f"Check Q{i}", key=f"check_{i}"):
+            if st.button(f"Check Q{i}", key=f"check_{quiz_version}_{i}"):
                 if q["options"].index(user_answer) == q["correct"]:
                     st.success("Correct!")
                 else:
@@ -144,11 +273,22 @@ if "study_material" in st.session_state:
             st.divider()
     else:
         st.info("Quiz not generated. Enable it above.")
-    # Cleanup PDF file when leaving the session
-    if data.get("pdf_file") and os.path.exists(data["pdf_file"]):
-        try:
-            os_sys.remove(data["pdf_file"])
-        except:
-            pass  # Ignore errors during cleanup
+    regenerate_button("quiz", data)
 else:
-    st.info("Enter a topic, choose difficulty, and click 'Generate Study Material'.")
\ No newline at end of file
+    st.info("Enter a topic, choose difficulty, and click 'Generate Study Material'.")
+
+if show_debug:
+    with st.sidebar.expander("Debug: last request", expanded=True):
+        debug_trace = st.session_state.get("debug_trace")
+        if debug_trace:
+            st.metric("Wall time", f"{debug_trace['wall_seconds']:.2f}s")
+            st.metric("Total tokens", debug_trace["total_tokens"])
+            st.json(debug_trace["events"])
+        else:
+            st.caption("No request recorded yet.")
+        st.download_button(
+            label="Metrics (Prometheus)",
+            data=metrics.REGISTRY.to_prometheus(),
+            file_name="metrics.txt",
+            mime="text/plain"
+        )
\ No newline at end of file
@@ -0,0 +1,395 @@
+"""JSON HTTP API over the generators, for programmatic clients such as an LMS.
+
+    python -m generation.api --port 8000 --workers 4 --concurrency 8 --max-queue 32
+
+Endpoints (all GET, parameters in the query string):
+
+    /v1/generate?topic=...&level=...&examples=1&quiz=1&bundle=0
+    /v1/sections/<content|examples|quiz>?topic=...&level=...
+    /v1/sections/<content|examples|quiz>?export_key=...
+    /v1/stream?topic=...&level=...        server-sent events as sections stream
+    /v1/export/<pdf|markdown>?export_key=...
+    /metrics, /healthz
+
+Generated material is stored in the shared response cache under its
+export_key, which /v1/generate and the end of /v1/stream return. Exports
+and sections requested by export_key are served from that stored copy
+without generating again, and 404 once it has expired. Responses carry an
+ETag derived from the section content hashes; revalidating /v1/generate
+with If-None-Match of a stored export_key gets a 304 without generating,
+even though a fresh quiz would differ.
+Generation runs on a bounded thread pool; requests beyond the concurrency
+limit wait in a bounded queue and are refused with 503 once it is full.
+Each worker process builds its own generators and shares the SQLite
+cache, question bank and rate limiter with the others.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .artifacts import artifact_hash, export_key, make_artifacts
+from .bundle_generator import BundleGenerator
+from .cache import get_default_cache
+from .content_generator import ContentGenerator
+from .example_generator import ExampleGenerator
+from .jobs import SECTION_GENERATORS
+from .notes_formatter import NotesFormatter
+from .pipeline import LEVELS, SECTIONS, StudyMaterialPipeline
+from .quize_generator import QuizGenerator
+
+DEFAULT_PORT = 8000
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_QUEUE = 32
+
+# Seconds a refused client is told to wait before retrying
+RETRY_AFTER_SECONDS = 5
+
+EXPORT_TYPES = {
+    "pdf": ("application/pdf", "pdf"),
+    "markdown": ("text/markdown; charset=utf-8", "md"),
+}
+
+
+class ServiceBusy(Exception):
+    """Raised when a request arrives while the wait queue is at its limit."""
+
+
+class GenerationService:
+    """Runs blocking generator calls off the event loop, within a concurrency and queue limit."""
+
+    def __init__(self, generators, concurrency=DEFAULT_CONCURRENCY, max_queue=DEFAULT_MAX_QUEUE, cache=None):
+        self.generators = generators
+        # Every running request can generate all of its sections at once
+        self.pipeline = StudyMaterialPipeline(generators, max_workers=concurrency * len(SECTIONS))
+        self.cache = cache or get_default_cache()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="study-api")
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+
+    async def run(self, function, *args):
+        """Run function(*args) on the pool once a slot is free; raises ServiceBusy if too many are waiting."""
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                metrics.REGISTRY.inc("api_rejections_total")
+                raise ServiceBusy()
+            self._waiting += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        finally:
+            self._slots.release()
+
+    async def run_store(self, function, *args):
+        """Run a quick store read or write off the event loop, without taking a generation slot."""
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def generate(self, topic, level, include_examples, include_quiz, bundle):
+        """Generate the material and return it as stored by store()."""
+        if bundle:
+            sections = self.generators["bundle"].generate_bundle(topic, level, include_examples, include_quiz)
+        else:
+            sections = self.pipeline.generate_all(topic, level, include_examples, include_quiz)
+        return self.store(topic, level, [include_examples, include_quiz, bundle], sections)
+
+    def store(self, topic, level, options, sections):
+        """Store generated material under its export key and return it."""
+        artifacts = make_artifacts(sections)
+        material = {
+            "topic": topic,
+            "level": level,
+            "options": options,
+            "sections": sections,
+            "artifacts": artifacts,
+            "export_key": export_key(topic, level, artifacts),
+        }
+        self.cache.set(f"material:{material['export_key']}", "material", material)
+        return material
+
+    def material(self, key):
+        """Return the material stored under an export key, or None if it is unknown or expired."""
+        return self.cache.get(f"material:{key}")
+
+    def revalidate(self, topic, level, options, keys):
+        """Return stored material for one of keys generated with the same topic, level and options, if any."""
+        for key in keys:
+            material = self.material(key)
+            if material and [material["topic"], material["level"], material["options"]] == [topic, level, options]:
+                return material
+        return None
+
+    def export(self, export_type, key):
+        """Return (material, PDF bytes or Markdown text) for stored material, or (None, None) if the key is unknown."""
+        material = self.material(key)
+        if material is None:
+            return None, None
+        sections = material["sections"]
+        render = NotesFormatter.render_pdf if export_type == "pdf" else NotesFormatter.render_markdown
+        return material, render(material["topic"], material["level"], sections["content"], sections["examples"],
+                                sections["quiz"], key=key)
+
+    def generate_section(self, section, topic, level):
+        generator, method = SECTION_GENERATORS[section]
+        return getattr(self.generators[generator], method)(topic, level)
+
+    def stream(self, topic, level, include_examples, include_quiz, emit):
+        """Run the streaming pipeline, passing each (section, event, value) to emit; emits None at the end."""
+        try:
+            for event in self.pipeline.stream(topic, level, include_examples, include_quiz):
+                emit(event)
+        finally:
+            emit(None)
+
+
+def _load_tornado():
+    import tornado.web
+
+    class BaseHandler(tornado.web.RequestHandler):
+        def initialize(self, service):
+            self.service = service
+            self.etag = None
+
+        def compute_etag(self):
+            # The content hash, so identical material gets the same ETag in every worker process
+            return f'"{self.etag}"' if self.etag else None
+
+        def material_args(self):
+            topic = self.get_query_argument("topic", "").strip()
+            level = self.get_query_argument("level", "Beginner")
+            if not topic:
+                raise tornado.web.HTTPError(400, reason="topic is required")
+            if level not in LEVELS:
+                raise tornado.web.HTTPError(400, reason=f"level must be one of {', '.join(LEVELS)}")
+            return topic, level
+
+        def flag(self, name, default):
+            return self.get_query_argument(name, "1" if default else "0") not in ("0", "false", "")
+
+        def options(self):
+            return [self.flag("examples", True), self.flag("quiz", True), self.flag("bundle", False)]
+
+        def stored_material(self, material):
+            if material is None:
+                raise tornado.web.HTTPError(404, reason="Unknown or expired export_key")
+            return material
+
+        async def generate(self, *args):
+            with metrics.timed("api_request_seconds", endpoint=self.endpoint):
+                try:
+                    return await self.service.run(*args)
+                except ServiceBusy:
+                    raise tornado.web.HTTPError(503, reason="Too many generation requests, please retry shortly")
+
+        def send_json(self, value, etag=None):
+            self.etag = etag
+            self.set_header("Content-Type", "application/json")
+            # Clients may keep responses but must revalidate them with the ETag
+            self.set_header("Cache-Control", "no-cache")
+            self.write(json.dumps(value))
+
+        def not_modified(self, etag):
+            """Set the ETag and return True, with a 304 status, if the client already has it."""
+            self.etag = etag
+            self.set_etag_header()
+            if self.check_etag_header():
+                self.set_status(304)
+                return True
+            return False
+
+        def write_error(self, status_code, **kwargs):
+            if status_code == 503:
+                self.set_header("Retry-After", str(RETRY_AFTER_SECONDS))
+            self.set_header("Content-Type", "application/json")
+            self.finish(json.dumps({"error": self._reason, "status": status_code}))
+
+    class GenerateHandler(BaseHandler):
+        endpoint = "generate"
+
+        async def get(self):
+            topic, level = self.material_args()
+            options = self.options()
+            # The ETags a client revalidates with are export keys, so stored material answers without generating
+            keys = re.findall(r'"([^"]*)"', self.request.headers.get("If-None-Match", ""))
+            material = keys and await self.service.run_store(self.service.revalidate, topic, level, options, keys)
+            if not material:
+                material = await self.generate(self.service.generate, topic, level, *options)
+            self.send_json({
+                "topic": topic,
+                "level": level,
+                "sections": material["sections"],
+                "artifacts": material["artifacts"],
+                "export_key": material["export_key"],
+            }, etag=material["export_key"])
+
+    class SectionHandler(BaseHandler):
+        endpoint = "section"
+
+        async def get(self, section):
+            key = self.get_query_argument("export_key", "")
+            if key:
+                material = self.stored_material(await self.service.run_store(self.service.material, key))
+                topic, level, value = material["topic"], material["level"], material["sections"][section]
+            else:
+                topic, level = self.material_args()
+                value = await self.generate(self.service.generate_section, section, topic, level)
+            value_hash = artifact_hash(value)
+            self.send_json({"topic": topic, "level": level, "section": section, "value": value,
+                            "hash": value_hash}, etag=value_hash)
+
+    class StreamHandler(BaseHandler):
+        endpoint = "stream"
+
+        async def get(self):
+            import tornado.iostream
+
+            topic, level = self.material_args()
+            include_examples, include_quiz, _ = self.options()
+            loop = asyncio.get_running_loop()
+            events = asyncio.Queue()
+
+            def emit(event):
+                loop.call_soon_threadsafe(events.put_nowait, event)
+
+            self.set_header("Content-Type", "text/event-stream")
+            self.set_header("Cache-Control", "no-cache")
+            # Stop reverse proxies from buffering the events
+            self.set_header("X-Accel-Buffering", "no")
+            task = asyncio.ensure_future(
+                self.generate(self.service.stream, topic, level, include_examples, include_quiz, emit)
+            )
+            # Also ends the loop when the task fails before streaming, such as with a 503
+            task.add_done_callback(lambda _: events.put_nowait(None))
+            sections = {}
+            try:
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    section, kind, value = event
+                    if kind == "done":
+                        sections[section] = value
+                    self.write(f"event: {kind}\ndata: {json.dumps({'section': section, 'value': value})}\n\n")
+                    await self.flush()
+                await task
+                material = await self.service.run_store(
+                    self.service.store, topic, level, [include_examples, include_quiz, False], sections
+                )
+                end = {"artifacts": material["artifacts"], "export_key": material["export_key"]}
+                self.write(f"event: end\ndata: {json.dumps(end)}\n\n")
+            except tornado.iostream.StreamClosedError:
+                # The client went away; the pipeline finishes in the background and still fills the cache
+                return
+            finally:
+                await asyncio.shield(task)
+
+    class ExportHandler(BaseHandler):
+        endpoint = "export"
+
+        async def get(self, export_type):
+            key = self.get_query_argument("export_key", "")
+            if not key:
+                raise tornado.web.HTTPError(400, reason="export_key is required")
+            # Exports are keyed by content, so a matching ETag skips the render; the key must still be stored
+            if self.not_modified(f"{export_type}-{key}"):
+                self.stored_material(await self.service.run_store(self.service.material, key))
+                return
+            material, data = await self.generate(self.service.export, export_type, key)
+            self.stored_material(material)
+            if data is None:
+                raise tornado.web.HTTPError(500, reason="Export failed")
+            content_type, extension = EXPORT_TYPES[export_type]
+            filename = "".join(c if c.isalnum() else "_" for c in f"{material['topic']}_{material['level']}_Study_Material")
+            self.set_header("Content-Type", content_type)
+            self.set_header("Content-Disposition", f'attachment; filename="{filename}.{extension}"')
+            self.set_header("Cache-Control", "no-cache")
+            self.write(data)
+
+    class MetricsHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_header("Content-Type", "text/plain; version=0.0.4")
+            self.write(metrics.REGISTRY.to_prometheus())
+
+    class HealthHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.write({"status": "ok"})
+
+    return {
+        "generate": GenerateHandler,
+        "section": SectionHandler,
+        "stream": StreamHandler,
+        "export": ExportHandler,
+        "metrics": MetricsHandler,
+        "health": HealthHandler,
+    }
+
+
+def load_generators():
+    generators = {
+        "content": ContentGenerator(),
+        "example": ExampleGenerator(),
+        "quiz": QuizGenerator(),
+    }
+    generators["bundle"] = BundleGenerator(generators["content"], generators["example"], generators["quiz"])
+    return generators
+
+
+def make_app(service):
+    """Build the Tornado application serving the API from service."""
+    import tornado.web
+
+    handlers = _load_tornado()
+    args = {"service": service}
+    sections = "|".join(SECTION_GENERATORS)
+    return tornado.web.Application([
+        (r"/v1/generate", handlers["generate"], args),
+        (rf"/v1/sections/({sections})", handlers["section"], args),
+        (r"/v1/stream", handlers["stream"], args),
+        (rf"/v1/export/({'|'.join(EXPORT_TYPES)})", handlers["export"], args),
+        (r"/metrics", handlers["metrics"]),
+        (r"/healthz", handlers["health"]),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the study material generators as a JSON HTTP API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes; 0 starts one per CPU")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="generation requests run at once per worker")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="requests waiting for a slot per worker before 503s are returned")
+    args = parser.parse_args(argv)
+    metrics.configure_logging()
+
+    import tornado.httpserver
+    import tornado.netutil
+    import tornado.process
+
+    sockets = tornado.netutil.bind_sockets(args.port, args.host)
+    print(f"Serving on http://{args.host}:{args.port}")
+    if args.workers != 1:
+        # Fork before any threads or database connections exist; each child serves the shared sockets
+        tornado.process.fork_processes(args.workers)
+
+    async def serve():
+        service = GenerationService(load_generators(), args.concurrency, args.max_queue)
+        server = tornado.httpserver.HTTPServer(make_app(service))
+        server.add_sockets(sockets)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Section artifacts: every generated section carries a version and a content hash.
+
+Exports are keyed by the hashes of the sections they are built from, so
+replacing one section only invalidates the exports that include it.
+
+ArtifactStore keeps one shared copy of each section value and rendered
+export per process, so sessions showing the same material hold only keys.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+from .metrics import REGISTRY, logger
+
+DEFAULT_ARTIFACT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SPILL_MAX_BYTES = 512 * 1024 * 1024
+
+
+def artifact_hash(value):
+    """Stable hash of a section value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def make_artifacts(sections, versions=None):
+    """Return {section: {"version", "hash"}} for a dict of section values."""
+    versions = versions or {}
+    return {
+        name: {"version": versions.get(name, 1), "hash": artifact_hash(value)}
+        for name, value in sections.items()
+    }
+
+
+def export_key(topic, level, artifacts):
+    """Key for an export built from these section artifacts."""
+    hashes = sorted((name, artifact["hash"]) for name, artifact in artifacts.items())
+    return hashlib.sha256(json.dumps([topic, level, hashes]).encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """Process-wide LRU of section values and rendered exports, deduplicated by key.
+
+    Section values are stored under their artifact_hash(), so every session
+    showing the same section shares one copy. Entries are evicted least
+    recently used once max_bytes is exceeded; with a spill_dir, evicted
+    entries are written there zlib-compressed and loaded back on the next get.
+    A spill file is deleted once loaded back, and the oldest files are
+    deleted whenever the directory grows past spill_max_bytes.
+    """
+
+    def __init__(self, max_bytes=None, spill_dir=None, spill_max_bytes=None):
+        self.max_bytes = max_bytes or int(os.environ.get("STUDY_ARTIFACT_MAX_BYTES", DEFAULT_ARTIFACT_MAX_BYTES))
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes or int(
+            os.environ.get("STUDY_ARTIFACT_SPILL_MAX_BYTES", DEFAULT_SPILL_MAX_BYTES)
+        )
+        self._spill_bytes = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_bytes = sum(size for _, size, _ in self._spill_files())
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, value, key=None):
+        """Store value, by default under its artifact_hash(), and return the key."""
+        key = key or artifact_hash(value)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return key
+        self._insert(key, value)
+        return key
+
+    def get(self, key):
+        """Return the value stored under key, or None if it was evicted and not spilled."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                REGISTRY.inc("artifact_store_requests_total", result="hit")
+                return entry[0]
+
+        value = self._load_spilled(key)
+        REGISTRY.inc("artifact_store_requests_total", result="miss" if value is None else "spill")
+        if value is not None:
+            self._insert(key, value)
+        return value
+
+    def get_or_build(self, key, build):
+        """Return the value under key, storing build() there first if missing; None results are not stored."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self._insert(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _insert(self, key, value):
+        size = len(value) if isinstance(value, (bytes, str)) else len(json.dumps(value))
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_value, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def _spill_path(self, key):
+        # Keys are hex digests, optionally prefixed with an export format like "pdf:"
+        return os.path.join(self.spill_dir, key.replace(":", "-") + ".z")
+
+    def _spill(self, key, value):
+        if not self.spill_dir:
+            return
+        if isinstance(value, bytes):
+            payload = b"b" + value
+        else:
+            payload = b"j" + json.dumps(value).encode("utf-8")
+        path = self._spill_path(key)
+        data = zlib.compress(payload)
+        try:
+            # Written under a temporary name so readers never see a partial file
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"Error spilling artifact {key}: {e}")
+            return
+        with self._lock:
+            self._spill_bytes += len(data)
+            over = self._spill_bytes > self.spill_max_bytes
+        if over:
+            self._prune_spilled()
+
+    def _load_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            payload = zlib.decompress(data)
+        except (OSError, zlib.error):
+            return None
+        # The value is back in memory, and spilled again if it is evicted again
+        self._remove_spilled(path, len(data))
+        if payload[:1] == b"b":
+            return payload[1:]
+        return json.loads(payload[1:])
+
+    def _spill_files(self):
+        """(path, size, mtime) of every spill file."""
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if not entry.name.endswith(".z"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _remove_spilled(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._spill_bytes = max(0, self._spill_bytes - size)
+
+    def _prune_spilled(self):
+        """Delete the oldest spill files until the directory is back under spill_max_bytes."""
+        files = sorted(self._spill_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        with self._lock:
+            # Resynchronise with files written or removed by other processes sharing the directory
+            self._spill_bytes = total
+        for path, size, _ in files:
+            if total <= self.spill_max_bytes:
+                break
+            self._remove_spilled(path, size)
+            total -= size
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_artifact_store():
+    """Return the process-wide artifact store; STUDY_ARTIFACT_SPILL_DIR enables spilling evictions to disk."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore(spill_dir=os.environ.get("STUDY_ARTIFACT_SPILL_DIR"))
+        return _default_store
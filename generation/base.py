@@ -0,0 +1,259 @@
+import time
+
+from .cache import ResponseCache, get_default_cache
+from .circuit import CircuitOpenError
+from .client import get_client
+from .metrics import REGISTRY, logger, record, record_usage
+from .routing import DEFAULT_MODEL, get_default_routing_policy
+from .singleflight import get_default_flight
+from .topics import get_default_topic_index
+
+
+class TruncatedResponseError(ValueError):
+    """Raised when a completion stopped at max_tokens; text holds what was generated before the cut-off."""
+
+    def __init__(self, text):
+        super().__init__("Groq response was cut off at max_tokens")
+        self.text = text
+
+
+class BaseGenerator:
+    """Shared Groq client, cache and request-coalescing plumbing for the section generators.
+
+    Topics are canonicalised before building cache keys, so near-duplicate
+    spellings of a topic share one cached result. Model, max_tokens and
+    temperature come from the routing policy for the generator's kind and
+    the requested level, and prompts ask for a response that fits the
+    max_tokens budget. Completions cut off at max_tokens raise
+    TruncatedResponseError, so they are never cached.
+    """
+
+    kind = None
+    prompts = {}
+
+    def __init__(self, client=None, cache=None, flight=None, topics=None, routes=None):
+        self.client = client if client is not None else get_client()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.flight = flight if flight is not None else get_default_flight()
+        self.topics = topics if topics is not None else get_default_topic_index()
+        self.routes = routes if routes is not None else get_default_routing_policy()
+
+    def _prompt_template(self, level):
+        return self.prompts.get(level, self.prompts["Beginner"])
+
+    def _resolve(self, topic, level):
+        """Return (cache_key, prompt, route) for a user-typed topic, using its canonical form.
+
+        The key uses the configured model rather than the routed one, so
+        cached answers keep being served while the latency SLO has moved
+        requests to the fast model. The prompt's length hint is part of the
+        key, so answers written for another output budget are not reused.
+        """
+        canonical, display = self.topics.canonicalize(topic)
+        configured = self.routes.configured(self.kind, level)
+        template = self._prompt_template(level) + configured.length_hint()
+        key = ResponseCache.make_key(self.kind, canonical, level, configured.model, template)
+        return key, template.format(topic=display), self.routes.route(self.kind, level)
+
+    def _cached(self, topic, level, compute, refresh=False, lookup=None):
+        """Return compute(prompt, **route_options) for this topic and level, serving repeats from the cache.
+
+        Concurrent identical calls share one in-flight request. compute should
+        raise on unusable responses so they are never cached. With refresh=True
+        the cached value is ignored and replaced by a fresh one. lookup, if
+        given, replaces the cache read used to pick up the result of an
+        identical call in another process.
+        """
+        started = time.perf_counter()
+        key, prompt, route = self._resolve(topic, level)
+        cached = None if refresh else self.cache.get(key)
+        if cached is not None:
+            self._record_call(started, "cache")
+            return cached
+
+        def compute_and_store():
+            value = compute(prompt, **route.options())
+            self._store(key, level, route, value)
+            return value
+
+        # A refresh must not accept the existing cache entry from another process either
+        if lookup is None and not refresh:
+            lookup = lambda: self.cache.get(key)
+        try:
+            value = self.flight.do(key, compute_and_store, lookup)
+        except CircuitOpenError:
+            stale = self.cache.get(key, allow_stale=True)
+            if stale is None:
+                raise
+            self._record_call(started, "stale")
+            return stale
+        self._record_call(started, "api")
+        return value
+
+    def _cacheable(self, value):
+        """Whether a computed value may be stored in the response cache; subclasses can refuse partial results."""
+        return True
+
+    def _store(self, key, level, route, value):
+        """Cache value under key, unless it is unacceptable or came from a model the SLO downgraded to.
+
+        Keys name the configured model, so a fast-model answer stored under
+        one would keep being served long after the configured model recovers.
+        """
+        if not self._cacheable(value):
+            return
+        if route.model != self.routes.configured(self.kind, level).model:
+            record("cache_skip", kind=self.kind, level=level, model=route.model, reason="downgraded")
+            return
+        self.cache.set(key, self.kind, value)
+
+    def prefetch(self, topic, level):
+        """Fill the cache for topic and level ahead of a request; errors propagate instead of falling back."""
+        self._cached(topic, level, self._request)
+
+    def _stream_cached(self, topic, level):
+        """Yield text chunks for this topic and level, caching the assembled text once complete.
+
+        A cache hit, or the result of an identical call already in flight, is
+        yielded as a single chunk.
+        """
+        started = time.perf_counter()
+        key, prompt, route = self._resolve(topic, level)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record_call(started, "cache")
+            yield cached
+            return
+
+        flight, leader = self.flight.acquire(key, lambda: self.cache.get(key))
+        if not leader:
+            try:
+                text = flight.wait(self.flight.lease_seconds)
+            except TruncatedResponseError as e:
+                # The leader already showed this text; it is served here too but was not cached
+                text = e.text
+            self._record_call(started, "api")
+            yield text
+            return
+
+        chunks = []
+        try:
+            for chunk in self._request_stream(prompt, **route.options()):
+                if not chunks:
+                    REGISTRY.observe("generation_first_token_seconds", time.perf_counter() - started, kind=self.kind)
+                chunks.append(chunk)
+                yield chunk
+            text = "".join(chunks)
+            self._store(key, level, route, text)
+        except CircuitOpenError as e:
+            self.flight.finish(key, flight, error=e)
+            stale = self.cache.get(key, allow_stale=True)
+            if stale is None:
+                raise
+            self._record_call(started, "stale")
+            yield stale
+            return
+        except BaseException as e:
+            # Also covers a consumer abandoning the stream, so waiting callers never hang
+            error = e if isinstance(e, Exception) else RuntimeError("Stream was abandoned")
+            self.flight.finish(key, flight, error=error)
+            raise
+        self.flight.finish(key, flight, value=text)
+        self._record_call(started, "api")
+
+    def _generate_with_fallback(self, topic, level, fallback, refresh=False):
+        """Return the text for this topic and level, or fallback(topic, level) if the request fails.
+
+        A response cut off at max_tokens is still better than the fallback;
+        it is served but, like any TruncatedResponseError, never cached.
+        """
+        try:
+            return self._cached(topic, level, self._request, refresh=refresh)
+        except TruncatedResponseError as e:
+            logger.warning(f"Error generating {self.kind} with Groq: {e}")
+            return e.text
+        except Exception as e:
+            logger.warning(f"Error generating {self.kind} with Groq: {e}")
+            self._record_fallback(topic, level, e)
+            return fallback(topic, level)
+
+    def _stream_with_fallback(self, topic, level, fallback):
+        """Stream text chunks, yielding fallback(topic, level) if the request fails before any text arrives."""
+        streamed = False
+        try:
+            for chunk in self._stream_cached(topic, level):
+                streamed = True
+                yield chunk
+        except Exception as e:
+            logger.warning(f"Error streaming {self.kind} with Groq: {e}")
+            if not streamed:
+                self._record_fallback(topic, level, e)
+                yield fallback(topic, level)
+
+    def _record_call(self, started, source):
+        seconds = time.perf_counter() - started
+        REGISTRY.observe("generation_call_seconds", seconds, kind=self.kind, source=source)
+        result = {"cache": "hit", "stale": "stale"}.get(source, "miss")
+        REGISTRY.inc("generation_cache_requests_total", kind=self.kind, result=result)
+        record("generation", kind=self.kind, source=source, seconds=round(seconds, 4))
+
+    def _record_fallback(self, topic, level, error):
+        REGISTRY.inc("generation_fallbacks_total", kind=self.kind)
+        record("fallback", kind=self.kind, topic=topic, level=level, error=str(error))
+
+    def _record_truncated(self, model):
+        REGISTRY.inc("generation_truncated_total", kind=self.kind, model=model)
+        record("truncated", kind=self.kind, model=model)
+
+    def _request(self, prompt, model=DEFAULT_MODEL, **options):
+        """Send a single-message chat completion and return its text; raises TruncatedResponseError if it was cut off."""
+        chat_completion = self.client.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=model,
+            **options,
+        )
+        tokens = record_usage(self.kind, model, getattr(chat_completion, "usage", None))
+        record("completion", kind=self.kind, model=model, **tokens)
+        choice = chat_completion.choices[0]
+        if getattr(choice, "finish_reason", None) == "length":
+            self._record_truncated(model)
+            raise TruncatedResponseError(choice.message.content or "")
+        return choice.message.content
+
+    def _request_stream(self, prompt, model=DEFAULT_MODEL, **options):
+        """Send a streaming chat completion and yield its text deltas.
+
+        Raises TruncatedResponseError after the last delta if the stream was cut off at max_tokens.
+        """
+        stream = self.client.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=model,
+            stream=True,
+            **options,
+        )
+        usage = None
+        finish_reason = None
+        parts = []
+        for chunk in stream:
+            # Groq reports usage on the final chunk under x_groq
+            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+            if chunk.choices:
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                if chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        tokens = record_usage(self.kind, model, usage)
+        record("completion", kind=self.kind, model=model, stream=True, **tokens)
+        if finish_reason == "length":
+            self._record_truncated(model)
+            raise TruncatedResponseError("".join(parts))
@@ -0,0 +1,249 @@
+"""Pre-generate study material for many topics from the command line.
+
+Input is JSONL with one {"topic": ..., "level": ...} object per line
+(an optional "id" overrides the default "<topic>|<level>" identifier).
+Results are appended to results.jsonl in the output directory, which also
+serves as the checkpoint: rerunning the same command skips finished items.
+
+    python -m generation.batch topics.jsonl --output-dir out --concurrency 4 --rpm 30 --tpm 6000 --pdf
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .bundle_generator import BundleGenerator
+from .content_generator import ContentGenerator
+from .example_generator import ExampleGenerator
+from .notes_formatter import NotesFormatter
+from .pipeline import LEVELS
+from .quize_generator import QuizGenerator
+from .rate_limit import BATCH, priority
+
+# Rough per-request token cost used for the tokens-per-minute budget
+ESTIMATED_TOKENS_PER_REQUEST = 1500
+
+
+class RateBudget:
+    """Blocking requests-per-minute and tokens-per-minute budget over a sliding 60s window.
+
+    This caps a single batch run; the account-wide quota is enforced by the
+    shared limiter in generation.rate_limit (GROQ_RPM / GROQ_TPM).
+    """
+
+    def __init__(self, rpm=None, tpm=None, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, requests, tokens):
+        """Block until requests and tokens fit in the current window, then record them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.window:
+                    self._events.popleft()
+                used_requests = sum(event[1] for event in self._events)
+                used_tokens = sum(event[2] for event in self._events)
+                fits_requests = not self.rpm or used_requests + requests <= self.rpm
+                fits_tokens = not self.tpm or used_tokens + tokens <= self.tpm
+                # An empty window always admits, so oversized items cannot deadlock
+                if not self._events or (fits_requests and fits_tokens):
+                    self._events.append((now, requests, tokens))
+                    return
+                wait = self.window - (now - self._events[0][0])
+            time.sleep(max(wait, 0.05))
+
+
+class BatchRunner:
+    def __init__(self, output_dir, concurrency=4, rpm=None, tpm=None, include_examples=True,
+                 include_quiz=True, export_pdf=False, bundle=False):
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.include_examples = include_examples
+        self.include_quiz = include_quiz
+        self.export_pdf = export_pdf
+        self.bundle = bundle
+        self.budget = RateBudget(rpm, tpm)
+
+        self.content_generator = ContentGenerator()
+        self.example_generator = ExampleGenerator()
+        self.quiz_generator = QuizGenerator()
+        self.bundle_generator = BundleGenerator(self.content_generator, self.example_generator, self.quiz_generator)
+
+        self.results_path = os.path.join(output_dir, "results.jsonl")
+        self._write_lock = threading.Lock()
+        self.stats = {"completed": 0, "skipped": 0, "failed": 0, "requests": 0}
+
+    def run(self, items):
+        """Generate every item not already in the checkpoint and return run statistics."""
+        os.makedirs(os.path.join(self.output_dir, "markdown"), exist_ok=True)
+        if self.export_pdf:
+            os.makedirs(os.path.join(self.output_dir, "pdf"), exist_ok=True)
+
+        done = self._completed_ids()
+        pending = [item for item in items if item["id"] not in done]
+        self.stats["skipped"] = len(items) - len(pending)
+
+        started = time.monotonic()
+        # Bound in-flight work so a huge input does not queue thousands of futures
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for item in pending:
+                slots.acquire()
+                future = executor.submit(self._run_item, item)
+                future.add_done_callback(lambda _: slots.release())
+        self.stats["elapsed"] = time.monotonic() - started
+        return self.stats
+
+    def _run_item(self, item):
+        try:
+            requests = self._request_count()
+            self.budget.acquire(requests, requests * ESTIMATED_TOKENS_PER_REQUEST)
+            # Batch requests yield the shared Groq quota to interactive users
+            with priority(BATCH), metrics.trace() as item_trace:
+                sections = self._generate(item["topic"], item["level"])
+            events = item_trace.summary()["events"]
+            fallbacks = fallback_kinds(events, self.include_examples, self.include_quiz)
+            if fallbacks:
+                # Canned fallback text must not reach the checkpoint, or reruns would skip the item forever
+                raise RuntimeError(f"fell back to placeholder content for {', '.join(fallbacks)}")
+            self._write_outputs(item, sections)
+            with self._write_lock:
+                self.stats["completed"] += 1
+                self.stats["requests"] += sum(1 for e in events if e["event"] == "completion")
+        except Exception as e:
+            print(f"Failed to generate {item['id']}: {e}", file=sys.stderr)
+            with self._write_lock:
+                self.stats["failed"] += 1
+
+    def _request_count(self):
+        if self.bundle:
+            return 1
+        return 1 + int(self.include_examples) + int(self.include_quiz)
+
+    def _generate(self, topic, level):
+        if self.bundle:
+            return self.bundle_generator.generate_bundle(topic, level, self.include_examples, self.include_quiz)
+        return {
+            "content": self.content_generator.generate_content(topic, level),
+            "examples": self.example_generator.generate_examples(topic, level) if self.include_examples else "",
+            "quiz": self.quiz_generator.generate_quiz(topic, level) if self.include_quiz else [],
+        }
+
+    def _write_outputs(self, item, sections):
+        slug = _slugify(item["id"])
+        markdown = NotesFormatter.format_markdown(sections["content"], sections["examples"], sections["quiz"])
+        with open(os.path.join(self.output_dir, "markdown", f"{slug}.md"), "w", encoding="utf-8") as f:
+            f.write(markdown)
+        if self.export_pdf:
+            pdf_path = os.path.join(self.output_dir, "pdf", f"{slug}.pdf")
+            exported = NotesFormatter.export_to_pdf(
+                item["topic"], item["level"], sections["content"], sections["examples"], sections["quiz"], pdf_path
+            )
+            if not exported:
+                # Not checkpointed, so the next run retries the item
+                raise RuntimeError("PDF export failed")
+
+        # The results line is written last, so its presence marks the item as finished
+        record = dict(item, **sections)
+        with self._write_lock:
+            with open(self.results_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _completed_ids(self):
+        done = set()
+        if not os.path.exists(self.results_path):
+            return done
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    # A run killed mid-write can leave a truncated last line
+                    continue
+        return done
+
+
+def fallback_kinds(events, include_examples=True, include_quiz=True):
+    """Sorted kinds of the returned sections that fell back to placeholder content, from trace events."""
+    kinds = {"content"}
+    if include_examples:
+        kinds.add("examples")
+    if include_quiz:
+        kinds.add("quiz")
+    # A failed bundle request is not a fallback once the section generators recover its sections
+    return sorted({e["kind"] for e in events if e["event"] == "fallback"} & kinds)
+
+
+def read_items(path):
+    """Read topic/level items from a JSONL file, skipping blank lines."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            topic = entry.get("topic", "").strip()
+            level = entry.get("level", "Beginner")
+            if not topic or level not in LEVELS:
+                print(f"Skipping invalid entry on line {line_number}", file=sys.stderr)
+                continue
+            items.append({"id": entry.get("id") or f"{topic}|{level}", "topic": topic, "level": level})
+    return items
+
+
+def _slugify(value):
+    """File-safe name for an item ID; the hash suffix keeps IDs like "C++" and "C#" apart."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")
+    return f"{slug}_{hashlib.sha256(value.encode('utf-8')).hexdigest()[:8]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate study material for topics listed in a JSONL file.")
+    parser.add_argument("input", help="JSONL file with topic and level fields")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--concurrency", type=int, default=4, help="topics generated at once")
+    parser.add_argument("--rpm", type=int, default=None, help="requests-per-minute budget")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens-per-minute budget")
+    parser.add_argument("--pdf", action="store_true", help="also export a PDF per topic")
+    parser.add_argument("--bundle", action="store_true", help="generate each topic with a single request")
+    parser.add_argument("--no-examples", action="store_true")
+    parser.add_argument("--no-quiz", action="store_true")
+    args = parser.parse_args(argv)
+    metrics.configure_logging()
+
+    items = read_items(args.input)
+    runner = BatchRunner(
+        args.output_dir,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        include_examples=not args.no_examples,
+        include_quiz=not args.no_quiz,
+        export_pdf=args.pdf,
+        bundle=args.bundle,
+    )
+    stats = runner.run(items)
+
+    elapsed = stats["elapsed"]
+    print(f"Completed {stats['completed']}, skipped {stats['skipped']} (checkpoint), failed {stats['failed']}")
+    print(f"Elapsed {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Throughput {stats['completed'] / elapsed:.2f} topics/s, {stats['requests'] * 60 / elapsed:.1f} API calls/min")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Latency and throughput benchmarks against the offline mock Groq backend.
+
+    python -m generation.benchmark --iterations 50 --concurrency 4 --latency 0.3 --jitter 0.1
+
+Every iteration uses a distinct topic and a fresh temporary cache, so the
+numbers measure generation work rather than cache hits. Mock calls are not
+rate limited and never use the host's shared rate-limit budget.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import ResponseCache
+from . import metrics
+from .client import GroqClient
+from .content_generator import ContentGenerator
+from .example_generator import ExampleGenerator
+from .mock_backend import MockGroq
+from .notes_formatter import NotesFormatter
+from .pipeline import StudyMaterialPipeline
+from .question_bank import QuestionBank
+from .quize_generator import QuizGenerator
+from .rate_limit import RateLimiter
+from .singleflight import SingleFlight
+from .topics import TopicIndex
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def measure(name, operation, iterations, concurrency):
+    """Run operation(i) for each iteration on a thread pool and return latency/throughput stats."""
+    latencies = []
+    lock = threading.Lock()
+
+    def run(i):
+        started = time.perf_counter()
+        operation(i)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, range(iterations)))
+    wall = time.perf_counter() - started
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput": iterations / wall if wall else 0.0,
+    }
+
+
+def run_benchmarks(iterations=50, concurrency=4, level="Intermediate", backend=None):
+    """Benchmark each generator, the full Generate flow, Markdown formatting and PDF export."""
+    backend = backend or MockGroq()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.sqlite3")
+        # A limiter without buckets, so mock calls never draw on the host's shared GROQ_RPM/GROQ_TPM budget
+        client = GroqClient(client=backend, backoff_base=0.05, backoff_max=2.0, limiter=RateLimiter(path=db_path))
+        shared = {
+            "client": client,
+            "cache": ResponseCache(db_path),
+            "flight": SingleFlight(db_path),
+            "topics": TopicIndex(db_path),
+        }
+        generators = {
+            "content": ContentGenerator(**shared),
+            "example": ExampleGenerator(**shared),
+            "quiz": QuizGenerator(bank=QuestionBank(db_path), **shared),
+        }
+        pipeline = StudyMaterialPipeline(generators)
+        sample = pipeline.generate_all("Benchmark Sample", level)
+
+        # Each run gets its own topic prefix so no result is ever served from cache
+        runs = [
+            ("generate_content", lambda i: generators["content"].generate_content(f"Content {i}", level)),
+            ("generate_examples", lambda i: generators["example"].generate_examples(f"Examples {i}", level)),
+            ("generate_quiz", lambda i: generators["quiz"].generate_quiz(f"Quiz {i}", level)),
+            ("full_generate", lambda i: pipeline.generate_all(f"Flow {i}", level)),
+            ("format_markdown", lambda i: NotesFormatter.format_markdown(
+                sample["content"], sample["examples"], sample["quiz"])),
+            ("export_to_pdf", lambda i: NotesFormatter.render_pdf(
+                f"PDF {i}", level, sample["content"], sample["examples"], sample["quiz"])),
+        ]
+        return [measure(name, operation, iterations, concurrency) for name, operation in runs]
+
+
+def format_results(results):
+    lines = [f"{'benchmark':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}"]
+    for r in results:
+        lines.append(
+            f"{r['name']:<20}{r['iterations']:>6}{r['p50'] * 1000:>10.1f}{r['p95'] * 1000:>10.1f}"
+            f"{r['p99'] * 1000:>10.1f}{r['throughput']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation against the mock Groq backend.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--level", default="Intermediate")
+    parser.add_argument("--latency", type=float, default=0.3, help="mean mock latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="latency standard deviation in seconds")
+    parser.add_argument("--chunk-interval", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-json-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    metrics.configure_logging()
+
+    backend = MockGroq(
+        latency=args.latency,
+        jitter=args.jitter,
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=0.1,
+        malformed_json_rate=args.malformed_json_rate,
+        seed=args.seed,
+    )
+    results = run_benchmarks(args.iterations, args.concurrency, args.level, backend)
+    print(format_results(results))
+    print(f"Mock API calls: {backend.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+
+from .base import BaseGenerator
+from .content_generator import ContentGenerator
+from .example_generator import ExampleGenerator
+from .metrics import logger
+from .question_bank import is_valid_question
+from .quize_generator import QuizGenerator
+
+_BUNDLE_FORMAT = """Respond with a single JSON object with exactly these fields:
+- "explanation": string, the explanation as plain text with paragraphs separated by blank lines
+- "examples": string, 3 numbered real-world examples separated by blank lines
+- "quiz": array of 3 objects with fields question (string), options (array of 4 strings), correct (index 0-3), explanation (string)"""
+
+# Prompt templates by difficulty level
+PROMPTS = {
+    "Beginner": "Create study material about {topic} for beginners. The explanation should cover the basic definition, purpose, and fundamental concepts in simple terms. The examples should be simple, relatable everyday applications. The quiz should test basic understanding with a brief explanation per question.\n\n" + _BUNDLE_FORMAT,
+    "Intermediate": "Create study material about {topic} for intermediate learners. The explanation should cover the underlying mechanisms, principles, how components interact, and real-world use cases. The examples should be industry-relevant professional applications. The quiz should test applied understanding with a brief explanation per question.\n\n" + _BUNDLE_FORMAT,
+    "Advanced": "Create study material about {topic} for advanced learners. The explanation should cover theoretical frameworks, complex implementations, current research, and critical analysis of methodologies. The examples should be cutting-edge research applications and emerging trends. The quiz should test deep understanding with a detailed explanation per question.\n\n" + _BUNDLE_FORMAT
+}
+
+class BundleGenerator(BaseGenerator):
+    """Generate explanation, examples and quiz in one JSON-mode completion.
+
+    Sections missing or invalid in the returned document are regenerated
+    individually by the regular section generators.
+    """
+
+    kind = "bundle"
+    prompts = PROMPTS
+
+    def __init__(self, content_generator=None, example_generator=None, quiz_generator=None,
+                 client=None, cache=None, flight=None, topics=None, routes=None):
+        super().__init__(client=client, cache=cache, flight=flight, topics=topics, routes=routes)
+        shared = {"client": client, "cache": cache, "flight": flight, "topics": topics, "routes": routes}
+        self.content_generator = content_generator or ContentGenerator(**shared)
+        self.example_generator = example_generator or ExampleGenerator(**shared)
+        self.quiz_generator = quiz_generator or QuizGenerator(**shared)
+
+    def generate_bundle(self, topic, level, include_examples=True, include_quiz=True):
+        """Generate all sections with one API call, returning {"content", "examples", "quiz"}."""
+        try:
+            document = self._cached(topic, level, self._request_bundle)
+        except Exception as e:
+            logger.warning(f"Error generating bundle with Groq: {e}")
+            self._record_fallback(topic, level, e)
+            document = {}
+
+        content = document.get("content")
+        if content is None:
+            content = self.content_generator.generate_content(topic, level)
+
+        examples = ""
+        if include_examples:
+            examples = document.get("examples")
+            if examples is None:
+                examples = self.example_generator.generate_examples(topic, level)
+
+        quiz_data = []
+        if include_quiz:
+            quiz_data = document.get("quiz")
+            if quiz_data is None:
+                quiz_data = self.quiz_generator.generate_quiz(topic, level)
+            else:
+                self.quiz_generator.add_to_bank(topic, level, quiz_data)
+
+        return {"content": content, "examples": examples, "quiz": quiz_data}
+
+    def prefetch(self, topic, level):
+        self._cached(topic, level, self._request_bundle)
+
+    def _request_bundle(self, prompt, **options):
+        """Request the bundle and keep only its valid sections; raises ValueError if none are usable."""
+        response_text = self._request(prompt, response_format={"type": "json_object"}, **options)
+        try:
+            document = json.loads(response_text)
+        except json.JSONDecodeError:
+            raise ValueError("Failed to parse bundle JSON from Groq response")
+        if not isinstance(document, dict):
+            raise ValueError("Bundle response is not a JSON object")
+
+        sections = {}
+        content = self._text_section(document.get("explanation"))
+        if content:
+            sections["content"] = content
+        examples = self._text_section(document.get("examples"))
+        if examples:
+            sections["examples"] = examples
+        quiz_data = document.get("quiz")
+        if isinstance(quiz_data, list) and quiz_data and all(is_valid_question(q) for q in quiz_data):
+            sections["quiz"] = quiz_data
+
+        if not sections:
+            raise ValueError("Bundle response has no valid sections")
+        return sections
+
+    @staticmethod
+    def _text_section(value):
+        """Normalise a text section; models sometimes return a list of paragraphs instead of a string."""
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            value = "\n\n".join(value)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+        return None
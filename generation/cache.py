@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .db import SQLiteStore
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+DEFAULT_TTLS = {
+    "content": 30 * DAY,
+    "examples": 30 * DAY,
+    "quiz": 7 * DAY,
+    # A bundle holds a quiz, so it expires with the shortest-lived section it contains
+    "bundle": 7 * DAY,
+    # Generated material kept for revalidation and exports by the API
+    "material": DAY,
+}
+
+# A hit only rewrites accessed_at when the stored time is older than this, to keep writes off the read path
+ACCESS_UPDATE_INTERVAL = 5 * 60
+
+
+class ResponseCache(SQLiteStore):
+    """Disk-backed LRU cache of generated sections, shared by all generators.
+
+    Entries live in a SQLite database in WAL mode, so several worker processes
+    on one host can read and write the same file. The total stored size is
+    kept in cache_meta and updated in the same transaction as each write, so
+    writes only scan the table when they have to evict.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)",
+        """CREATE TABLE IF NOT EXISTS cache_meta (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )""",
+    )
+
+    def __init__(self, path=None, max_bytes=None, ttls=None):
+        super().__init__(path)
+        self.max_bytes = max_bytes or int(os.environ.get("STUDY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        if self._connection().execute("SELECT 1 FROM cache_meta WHERE name = 'bytes'").fetchone() is None:
+            self._transaction(self._init_total)
+
+    @staticmethod
+    def _init_total(conn):
+        # Databases written before the running total existed are summed once
+        conn.execute(
+            "INSERT OR IGNORE INTO cache_meta (name, value) "
+            "SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses"
+        )
+
+    @staticmethod
+    def make_key(kind, topic, level, model, prompt_template):
+        """Build a cache key; hashing the template means prompt edits invalidate old entries."""
+        template_hash = hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()
+        raw = json.dumps([kind, topic, level, model, template_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key, allow_stale=False):
+        """Return the cached value for key, or None if missing or expired.
+
+        Expired entries stay stored until replaced or evicted, so allow_stale
+        can still serve them while Groq is unavailable.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT kind, value, created_at, accessed_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        kind, value, created_at, accessed_at = row
+        now = time.time()
+        ttl = self.ttls.get(kind)
+        if ttl is not None and now - created_at > ttl and not allow_stale:
+            return None
+
+        # LRU order only needs to be roughly right, so most hits skip the write lock entirely
+        if now - accessed_at > ACCESS_UPDATE_INTERVAL:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, kind, value):
+        """Store a JSON-serialisable value and evict least recently used entries if over budget."""
+        encoded = json.dumps(value)
+        now = time.time()
+
+        def write(conn):
+            replaced = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, encoded, len(encoded), now, now),
+            )
+            total = self._add_bytes(conn, len(encoded) - (replaced[0] if replaced else 0))
+            if total > self.max_bytes:
+                self._evict(conn, total)
+
+        self._transaction(write)
+
+    def delete(self, key):
+        def remove(conn):
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._add_bytes(conn, -row[0])
+
+        self._transaction(remove)
+
+    def clear(self):
+        def remove_all(conn):
+            conn.execute("DELETE FROM responses")
+            conn.execute("UPDATE cache_meta SET value = 0 WHERE name = 'bytes'")
+
+        self._transaction(remove_all)
+
+    def stats(self):
+        """Return entry count and total stored bytes."""
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    @staticmethod
+    def _add_bytes(conn, delta):
+        """Adjust the running total of stored bytes and return the new total."""
+        conn.execute("UPDATE cache_meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+        (total,) = conn.execute("SELECT value FROM cache_meta WHERE name = 'bytes'").fetchone()
+        return total
+
+    def _evict(self, conn, total):
+        """Delete least recently used entries until total is back under max_bytes."""
+        excess = total - self.max_bytes
+        victims = []
+        freed = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._add_bytes(conn, -freed)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide cache shared by all generators."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
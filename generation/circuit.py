@@ -0,0 +1,108 @@
+import collections
+import threading
+import time
+
+from .metrics import REGISTRY, logger, record
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW_SECONDS = 30.0
+DEFAULT_MIN_CALLS = 5
+DEFAULT_FAILURE_RATE = 0.5
+# Calls slower than this count as slow; a window mostly made of slow calls trips the breaker too
+DEFAULT_SLOW_CALL_SECONDS = 10.0
+DEFAULT_SLOW_CALL_RATE = 0.5
+DEFAULT_OPEN_SECONDS = 20.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Groq while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling Groq while it is failing or slow, so callers fall back immediately.
+
+    Outcomes of the calls in a sliding window are tracked. Once at least
+    min_calls have been seen and the failure or slow-call rate crosses its
+    threshold, the breaker opens and every call fails fast with
+    CircuitOpenError. After open_seconds it goes half-open and lets a single
+    probe through: success closes it, failure opens it again.
+    """
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, min_calls=DEFAULT_MIN_CALLS,
+                 failure_rate=DEFAULT_FAILURE_RATE, slow_call_seconds=DEFAULT_SLOW_CALL_SECONDS,
+                 slow_call_rate=DEFAULT_SLOW_CALL_RATE, open_seconds=DEFAULT_OPEN_SECONDS, name="groq"):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.name = name
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        # (timestamp, failed, slow) for each finished call
+        self._outcomes = collections.deque()
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    REGISTRY.inc("circuit_rejections_total", breaker=self.name)
+                    raise CircuitOpenError(f"Circuit {self.name} is open; skipping the request")
+                self._transition(HALF_OPEN)
+            if self._probing:
+                REGISTRY.inc("circuit_rejections_total", breaker=self.name)
+                raise CircuitOpenError(f"Circuit {self.name} is half-open and already probing")
+            self._probing = True
+
+    def record_success(self, seconds):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self._transition(CLOSED)
+                return
+            self._add(failed=False, slow=self.slow_call_seconds is not None and seconds > self.slow_call_seconds)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self._transition(OPEN)
+                return
+            self._add(failed=True, slow=False)
+
+    def release(self):
+        """Give up a half-open probe slot without an outcome, e.g. when the call was never sent."""
+        with self._lock:
+            self._probing = False
+
+    def _add(self, failed, slow):
+        now = time.monotonic()
+        self._outcomes.append((now, failed, slow))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+        if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        total = len(self._outcomes)
+        failures = sum(1 for _, f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, _, s in self._outcomes if s)
+        if failures / total >= self.failure_rate or slow_calls / total >= self.slow_call_rate:
+            self._transition(OPEN)
+
+    def _transition(self, state):
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        self.state = state
+        REGISTRY.inc("circuit_transitions_total", breaker=self.name, state=state)
+        record("circuit_state", breaker=self.name, state=state)
+        logger.warning(f"Circuit {self.name} is now {state}")
@@ -0,0 +1,323 @@
+import email.utils
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+from dotenv import load_dotenv
+
+from .circuit import CircuitBreaker
+from .metrics import REGISTRY, logger, record
+from .rate_limit import BACKGROUND, RateLimitExceeded, estimate_tokens, get_default_limiter
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+
+# Latency samples needed before the observed p95 is trusted as a hedge delay
+HEDGE_MIN_SAMPLES = 20
+
+# Status codes worth retrying; anything else is a real failure
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Groq rate-limit reset headers look like "1m30.5s", "7.66s" or "250ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class GroqClient:
+    """Groq chat-completions client shared by all generators.
+
+    Requests go through one keep-alive connection pool, so repeated calls
+    skip the TCP and TLS handshakes. Transient failures are retried with
+    exponential backoff and jitter, honoring retry-after and Groq's
+    rate-limit reset headers. Every attempt first takes capacity from the
+    shared rate limiter, so processes on the host stay under the quota.
+
+    A circuit breaker fails calls fast while Groq is erroring or slow. With
+    hedge=True, a non-streaming call still running after the observed p95
+    latency is duplicated and the first response wins.
+
+    The Groq SDK and httpx are imported, and the SDK client built, on the
+    first request rather than at startup.
+    """
+
+    def __init__(self, api_key=None, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=0.5, backoff_max=20.0, max_connections=20, client=None, limiter=None,
+                 breaker=None, hedge=False):
+        self.timeout = timeout
+        self.limiter = limiter if limiter is not None else get_default_limiter()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.hedge = hedge
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="groq-hedge") if hedge else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The underlying SDK client, built on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def _build_client(self):
+        import httpx
+        from groq import Groq
+
+        http_client = httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60,
+            ),
+        )
+        # Retries are handled here so they can honor rate-limit headers
+        return Groq(
+            api_key=self.api_key or os.environ.get("GROQ_API_KEY"),
+            http_client=http_client,
+            max_retries=0,
+            timeout=self.timeout,
+        )
+
+    def create(self, timeout=None, **params):
+        """Create a chat completion, retrying transient failures.
+
+        timeout overrides the client default for this call. For stream=True
+        only opening the stream is retried. Raises CircuitOpenError without
+        calling Groq while the circuit breaker is open.
+        """
+        model = params.get("model")
+        stream = "true" if params.get("stream") else "false"
+        timeout = timeout if timeout is not None else self.timeout
+        estimated = estimate_tokens(params.get("messages", []), params.get("max_tokens"))
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                self.limiter.acquire(estimated)
+            except RateLimitExceeded:
+                self.breaker.release()
+                raise
+            started = time.perf_counter()
+            try:
+                if self.hedge and not params.get("stream"):
+                    response = self._hedged_call(timeout, params, estimated)
+                else:
+                    response = self.client.chat.completions.create(timeout=timeout, **params)
+                elapsed = time.perf_counter() - started
+                REGISTRY.observe("groq_request_seconds", elapsed, model=model, stream=stream)
+                if params.get("stream"):
+                    # Opening a stream only waits for the headers; the outcome is recorded once the body ends
+                    return self._reconciling_stream(response, estimated, model, started)
+                self.breaker.record_success(elapsed)
+                REGISTRY.observe("groq_completion_seconds", elapsed, model=model)
+                if not self.hedge:
+                    self.limiter.reconcile(estimated, _total_tokens(getattr(response, "usage", None)))
+                return response
+            except Exception as e:
+                REGISTRY.observe("groq_request_seconds", time.perf_counter() - started, model=model, stream=stream)
+                if self._is_retryable(e):
+                    self.breaker.record_failure()
+                else:
+                    # Client errors say nothing about Groq's health
+                    self.breaker.release()
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                status = getattr(e, "status_code", None) or type(e).__name__
+                REGISTRY.inc("groq_retries_total", model=model, status=status)
+                record("groq_retry", model=model, status=status, attempt=attempt + 1, delay=round(delay, 2))
+                logger.warning(f"Groq request failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def _hedged_call(self, timeout, params, estimated):
+        """Send the request, duplicating it if no response arrives within the observed p95 latency."""
+        model = params.get("model")
+        primary = self._submit_hedge(timeout, params, estimated)
+        delay = self._hedge_delay(model)
+        if delay is None or wait([primary], timeout=delay).done:
+            return primary.result()
+
+        try:
+            # Hedges are extra load, so they only use capacity that background work could
+            self.limiter.acquire(estimated, BACKGROUND)
+        except RateLimitExceeded:
+            return primary.result()
+        REGISTRY.inc("groq_hedged_requests_total", model=model)
+        record("groq_hedge", model=model, delay=round(delay, 3))
+        hedge = self._submit_hedge(timeout, params, estimated)
+
+        for future in as_completed([primary, hedge]):
+            if future.exception() is None:
+                if future is hedge:
+                    REGISTRY.inc("groq_hedge_wins_total", model=model)
+                return future.result()
+        raise primary.exception()
+
+    def _submit_hedge(self, timeout, params, estimated):
+        future = self._hedge_executor.submit(self.client.chat.completions.create, timeout=timeout, **params)
+
+        def reconcile(done):
+            # The losing request still spent tokens, so both are reconciled
+            if done.exception() is None:
+                self.limiter.reconcile(estimated, _total_tokens(getattr(done.result(), "usage", None)))
+
+        future.add_done_callback(reconcile)
+        return future
+
+    @staticmethod
+    def _hedge_delay(model):
+        # Only full non-streaming completions are comparable with the call being hedged
+        if REGISTRY.sample_count("groq_request_seconds", model=model, stream="false") < HEDGE_MIN_SAMPLES:
+            return None
+        return REGISTRY.quantile("groq_request_seconds", 0.95, model=model, stream="false")
+
+    def _reconciling_stream(self, stream, estimated, model, started):
+        """Pass chunks through, correcting the token estimate from the usage on the final chunk.
+
+        The circuit breaker sees the stream's full duration, and errors
+        raised while reading it count as failures.
+        """
+        usage = None
+        try:
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(chunk, "usage", None) or getattr(x_groq, "usage", None) or usage
+                yield chunk
+            elapsed = time.perf_counter() - started
+            REGISTRY.observe("groq_completion_seconds", elapsed, model=model)
+            self.breaker.record_success(elapsed)
+        except Exception as e:
+            if self._is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            # An abandoned stream says nothing about Groq's health, but must not hold a half-open probe
+            self.breaker.release()
+            raise
+        finally:
+            self.limiter.reconcile(estimated, _total_tokens(usage))
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying error, or None if it should not be retried."""
+        if attempt >= self.max_retries or not self._is_retryable(error):
+            return None
+
+        server_delay = self._server_retry_after(error)
+        if server_delay is not None:
+            if server_delay > self.backoff_max:
+                # Waiting that long would be worse than failing over to fallback content
+                return None
+            return server_delay + random.uniform(0, self.backoff_base)
+
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _is_retryable(error):
+        if getattr(error, "status_code", None) in RETRY_STATUS_CODES:
+            return True
+        import httpx
+        from groq import APIConnectionError
+
+        return isinstance(error, (APIConnectionError, httpx.TransportError))
+
+    @staticmethod
+    def _server_retry_after(error):
+        """Parse the wait the server asked for from retry-after or rate-limit reset headers."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                try:
+                    parsed = email.utils.parsedate_to_datetime(retry_after)
+                except (TypeError, ValueError):
+                    # Unparseable values are ignored, so the API error itself is what gets raised
+                    return None
+                return max(0.0, parsed.timestamp() - time.time())
+
+        if getattr(error, "status_code", None) == 429:
+            resets = [
+                _parse_duration(headers.get(name))
+                for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+            ]
+            resets = [reset for reset in resets if reset is not None]
+            if resets:
+                return max(resets)
+        return None
+
+
+def _total_tokens(usage):
+    if usage is None:
+        return None
+    return getattr(usage, "total_tokens", None)
+
+
+def _parse_duration(value):
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client shared by all generators."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            backend = None
+            if os.environ.get("STUDY_MOCK_BACKEND") == "1":
+                from .mock_backend import MockGroq
+                backend = MockGroq.from_env()
+            _shared_client = GroqClient(
+                timeout=float(os.environ.get("GROQ_TIMEOUT", DEFAULT_TIMEOUT)),
+                max_retries=int(os.environ.get("GROQ_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+                client=backend,
+                hedge=os.environ.get("GROQ_HEDGE") == "1",
+            )
+        return _shared_client
+
+
+def set_client(client):
+    """Replace the shared client, e.g. with one wrapping MockGroq for benchmarks."""
+    global _shared_client
+    with _shared_client_lock:
+        _shared_client = client
@@ -1,42 +1,23 @@
+from .base import BaseGenerator
 
-import os
-from groq import Groq
-from dotenv import load_dotenv
+# Prompt templates by difficulty level
+PROMPTS = {
+    "Beginner": "Explain {topic} in simple terms suitable for beginners. Focus on the basic definition, purpose, and fundamental concepts. Make it easy to understand for someone with no prior knowledge. Include key aspects to learn and practical applications.",
+    "Intermediate": "Provide a detailed explanation of {topic} suitable for intermediate learners. Explain the underlying mechanisms, principles, and practical applications. Include how different components interact, various methodologies, and real-world use cases.",
+    "Advanced": "Deliver a comprehensive explanation of {topic} for advanced learners. Cover theoretical frameworks, complex implementations, current research, and critical analysis of different methodologies. Discuss innovations and future directions in the field."
+}
 
-# Load environment variables from .env file
-load_dotenv()
-
-class ContentGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+class ContentGenerator(BaseGenerator):
+    kind = "content"
+    prompts = PROMPTS
     
-    def generate_content(self, topic, level):
-        """Generate structured, difficulty-specific explanation using Groq API."""
-        try:
-            # Define prompt based on difficulty level
-            prompts = {
-                "Beginner": f"Explain {topic} in simple terms suitable for beginners. Focus on the basic definition, purpose, and fundamental concepts. Make it easy to understand for someone with no prior knowledge. Include key aspects to learn and practical applications.",
-                "Intermediate": f"Provide a detailed explanation of {topic} suitable for intermediate learners. Explain the underlying mechanisms, principles, and practical applications. Include how different components interact, various methodologies, and real-world use cases.",
-                "Advanced": f"Deliver a comprehensive explanation of {topic} for advanced learners. Cover theoretical frameworks, complex implementations, current research, and critical analysis of different methodologies. Discuss innovations and future directions in the field."
-            }
-            
-            prompt = prompts.get(level, prompts["Beginner"])
-            
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model="llama-3.1-8b-instant",  # Using Llama 3.1 model
-            )
-            
-            return chat_completion.choices[0].message.content
-        except Exception as e:
-            # Fallback to original content if API fails
-            print(f"Error generating content with Groq: {e}")
-            return self._fallback_content(topic, level)
+    def generate_content(self, topic, level, refresh=False):
+        """Generate structured, difficulty-specific explanation using Groq API; refresh=True skips the cache."""
+        return self._generate_with_fallback(topic, level, self._fallback_content, refresh)
+    
+    def stream_content(self, topic, level):
+        """Yield the explanation in text chunks as it streams from the Groq API."""
+        return self._stream_with_fallback(topic, level, self._fallback_content)
     
     def _fallback_content(self, topic, level):
         """Fallback content when model is unavailable"""
@@ -0,0 +1,261 @@
+"""Export many topics as one course pack: a Markdown file and/or a PDF with a table of contents.
+
+Input is the same JSONL format as generation.batch:
+
+    python -m generation.course_pack course.jsonl --title "Intro to CS" --markdown pack.md --pdf pack.pdf
+
+Topics are generated in parallel and spilled to a temporary file as they
+finish, so only a bounded number of results are ever held in memory. The
+Markdown is then streamed to disk topic by topic, and the PDF is laid out
+from a lazy story that reads one topic at a time from the spill file.
+
+If any topic fails or falls back to placeholder content, nothing is written
+and the command exits non-zero.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from . import metrics
+from .batch import fallback_kinds, read_items
+from .content_generator import ContentGenerator
+from .example_generator import ExampleGenerator
+from .notes_formatter import NotesFormatter
+from .pipeline import StudyMaterialPipeline
+from .quize_generator import QuizGenerator
+from .rate_limit import BATCH, priority
+
+# Flowables pulled ahead of the one being laid out, so keepWithNext headings see what follows them
+STORY_LOOKAHEAD = 16
+
+# Layout passes before giving up on table-of-contents page numbers settling
+MAX_PDF_PASSES = 3
+
+# Failed topics listed in the error before the rest are summarised
+MAX_REPORTED_FAILURES = 10
+
+
+class CoursePackError(RuntimeError):
+    """Raised when topics failed or fell back to placeholder content, so no pack was written."""
+
+
+class _LazyStory:
+    """List-like story that pulls flowables from an iterator as ReportLab consumes them.
+
+    BaseDocTemplate.build only looks at the front of the list (indexing,
+    slicing, deleting and inserting there), so keeping a short buffer lets
+    it lay out a document whose flowables never exist all at once.
+    """
+
+    def __init__(self, flowables):
+        self._source = iter(flowables)
+        self._buffer = []
+
+    def _fill(self, size):
+        while len(self._buffer) < size:
+            flowable = next(self._source, None)
+            if flowable is None:
+                return
+            self._buffer.append(flowable)
+
+    def __len__(self):
+        self._fill(STORY_LOOKAHEAD)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else STORY_LOOKAHEAD)
+        else:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index, flowable):
+        self._buffer.insert(index, flowable)
+
+
+class CoursePackExporter:
+    def __init__(self, pipeline=None, concurrency=4, include_examples=True, include_quiz=True):
+        if pipeline is None:
+            pipeline = StudyMaterialPipeline({
+                "content": ContentGenerator(),
+                "example": ExampleGenerator(),
+                "quiz": QuizGenerator(),
+            })
+        self.pipeline = pipeline
+        self.concurrency = concurrency
+        self.include_examples = include_examples
+        self.include_quiz = include_quiz
+
+    def export(self, entries, title="Course Pack", markdown_path=None, pdf_path=None):
+        """Generate every (topic, level) entry and write the requested outputs; returns the PDF page count.
+
+        Raises CoursePackError without writing anything if any entry failed.
+        """
+        with tempfile.TemporaryFile() as spill:
+            offsets = self._generate(entries, spill)
+            if markdown_path:
+                self._write_markdown(entries, spill, offsets, title, markdown_path)
+            if pdf_path:
+                return self._write_pdf(entries, spill, offsets, title, pdf_path)
+        return None
+
+    def _generate(self, entries, spill):
+        """Generate entries in parallel, appending each result to spill; returns each entry's offset."""
+        offsets = [None] * len(entries)
+        lock = threading.Lock()
+
+        def run(index, topic, level):
+            # Course packs are bulk work, so they yield the rate budget to interactive users
+            with priority(BATCH), metrics.trace() as entry_trace:
+                sections = self.pipeline.generate_all(topic, level, self.include_examples, self.include_quiz)
+            fallbacks = fallback_kinds(entry_trace.summary()["events"], self.include_examples, self.include_quiz)
+            if fallbacks:
+                raise RuntimeError(f"fell back to placeholder content for {', '.join(fallbacks)}")
+            line = json.dumps(sections).encode("utf-8") + b"\n"
+            with lock:
+                spill.seek(0, os.SEEK_END)
+                offsets[index] = spill.tell()
+                spill.write(line)
+
+        # Bound in-flight work so results are spilled about as fast as they are produced
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for index, (topic, level) in enumerate(entries):
+                slots.acquire()
+                future = executor.submit(run, index, topic, level)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+        spill.flush()
+
+        failures = []
+        for (topic, level), future in zip(entries, futures):
+            error = future.exception()
+            if error is not None:
+                failures.append(f"{topic} ({level}): {error}")
+        if failures:
+            listed = "\n".join(failures[:MAX_REPORTED_FAILURES])
+            if len(failures) > MAX_REPORTED_FAILURES:
+                listed += f"\n... and {len(failures) - MAX_REPORTED_FAILURES} more"
+            raise CoursePackError(f"{len(failures)} of {len(entries)} topics failed:\n{listed}")
+        return offsets
+
+    @staticmethod
+    def _load(spill, offset):
+        spill.seek(offset)
+        return json.loads(spill.readline())
+
+    def _write_markdown(self, entries, spill, offsets, title, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# {title}\n\n## Contents\n\n")
+            for number, (topic, level) in enumerate(entries, 1):
+                f.write(f"{number}. {topic} ({level})\n")
+            f.write("\n")
+            for number, ((topic, level), offset) in enumerate(zip(entries, offsets), 1):
+                sections = self._load(spill, offset)
+                f.write(f"## {number}. {topic} ({level})\n\n")
+                f.write(NotesFormatter.format_markdown_sections(
+                    sections["content"], sections["examples"], sections["quiz"], heading="###"
+                ))
+
+    def _write_pdf(self, entries, spill, offsets, title, path):
+        """Lay the pack out until the table of contents page numbers settle, then keep the last pass."""
+        # The first pass prints placeholder page numbers of the same width, so it paginates identically
+        pages = [None] * len(entries)
+        for _ in range(MAX_PDF_PASSES):
+            found, page_count = self._render_pdf(entries, spill, offsets, title, pages, path)
+            if found == pages:
+                break
+            pages = found
+        return page_count
+
+    def _render_pdf(self, entries, spill, offsets, title, pages, path):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+
+        class CoursePackTemplate(SimpleDocTemplate):
+            def afterFlowable(self, flowable):
+                number = getattr(flowable, "course_pack_entry", None)
+                if number is not None:
+                    found[number] = self.page
+                    key = f"topic-{number}"
+                    self.canv.bookmarkPage(key)
+                    self.canv.addOutlineEntry(flowable.getPlainText(), key, level=0)
+
+        found = [None] * len(entries)
+        doc = CoursePackTemplate(path, pagesize=letter, title=title)
+        doc.build(_LazyStory(self._story(entries, spill, offsets, title, pages, doc.width)))
+        return found, doc.page
+
+    def _story(self, entries, spill, offsets, title, pages, width):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import PageBreak, Paragraph, Spacer, Table, TableStyle
+
+        styles = NotesFormatter.get_styles()
+        yield Paragraph(escape(title), styles['CustomTitle'])
+        yield Paragraph("Contents", styles['CustomHeading'])
+
+        number_width = 0.6 * inch
+        row_style = TableStyle([
+            ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ])
+        for number, ((topic, level), page) in enumerate(zip(entries, pages)):
+            label = Paragraph(f"{number + 1}. {escape(topic)} ({escape(level)})", styles['Normal'])
+            page_label = str(page) if page is not None else "000"
+            yield Table([[label, page_label]], colWidths=[width - number_width, number_width], style=row_style)
+
+        for number, ((topic, level), offset) in enumerate(zip(entries, offsets)):
+            sections = self._load(spill, offset)
+            yield PageBreak()
+            heading = Paragraph(f"{number + 1}. {escape(topic)} ({escape(level)})", styles['CustomTitle'])
+            heading.course_pack_entry = number
+            yield heading
+            yield Spacer(1, 0.2 * inch)
+            yield from NotesFormatter.section_flowables(sections["content"], sections["examples"], sections["quiz"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the topics in a JSONL file as one course pack.")
+    parser.add_argument("input", help="JSONL file with topic and level fields")
+    parser.add_argument("--title", default="Course Pack")
+    parser.add_argument("--markdown", help="path of the Markdown file to write")
+    parser.add_argument("--pdf", help="path of the PDF file to write")
+    parser.add_argument("--concurrency", type=int, default=4, help="topics generated at once")
+    parser.add_argument("--no-examples", action="store_true")
+    parser.add_argument("--no-quiz", action="store_true")
+    args = parser.parse_args(argv)
+    metrics.configure_logging()
+    if not args.markdown and not args.pdf:
+        parser.error("at least one of --markdown and --pdf is required")
+
+    entries = [(item["topic"], item["level"]) for item in read_items(args.input)]
+    exporter = CoursePackExporter(
+        concurrency=args.concurrency,
+        include_examples=not args.no_examples,
+        include_quiz=not args.no_quiz,
+    )
+    try:
+        pages = exporter.export(entries, args.title, args.markdown, args.pdf)
+    except CoursePackError as e:
+        print(f"Course pack not written: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {len(entries)} topics" + (f", {pages} pages" if pages else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
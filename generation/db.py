@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join(".cache", "study_material.sqlite3")
+
+
+def default_db_path():
+    """Path of the SQLite database shared by the cache and cross-process coordination."""
+    return os.environ.get("STUDY_CACHE_PATH", DEFAULT_DB_PATH)
+
+
+class SQLiteStore:
+    """Base for SQLite-backed stores shared between threads and worker processes.
+
+    Each thread gets its own autocommit connection to a WAL-mode database;
+    multi-statement writes use explicit BEGIN IMMEDIATE transactions.
+    """
+
+    schema = ()
+
+    def __init__(self, path=None):
+        self.path = path or default_db_path()
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        for statement in self.schema:
+            conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        """Run work(conn) inside a write transaction and return its result."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
@@ -0,0 +1,318 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .artifacts import export_key, make_artifacts
+from .db import SQLiteStore
+from .metrics import logger
+from .notes_formatter import NotesFormatter
+from .pipeline import SECTIONS
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_QUEUE_DEPTH = 32
+
+# Minimum seconds between writes of streamed partial text to the job row
+PROGRESS_INTERVAL = 0.5
+
+# Jobs not updated for this long were owned by a worker that died
+STALE_SECONDS = 300
+
+# Seconds between touches of the jobs this process owns, so waiting jobs are never mistaken for stale ones
+HEARTBEAT_INTERVAL = 30
+
+# Seconds between sweeps for stale jobs and finished jobs past retention
+CLEANUP_INTERVAL = 10 * 60
+
+# Finished jobs, including their PDFs, are kept this long for refreshes and downloads
+RETENTION_SECONDS = 24 * 60 * 60
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Generator and method that regenerate each section on its own
+SECTION_GENERATORS = {
+    "content": ("content", "generate_content"),
+    "examples": ("example", "generate_examples"),
+    "quiz": ("quiz", "generate_quiz"),
+}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class JobQueue(SQLiteStore):
+    """Runs study-material generation in background workers, tracked in a SQLite job table.
+
+    submit() returns a job ID immediately. Workers stream the sections and
+    write progress to the job row as they go, so any script run (or any
+    process on the host) can poll get() and render finished sections, and a
+    job survives the browser refreshing. With a prefetcher, each finished job
+    is added to the request history and schedules its topic's other levels.
+
+    submit_section() regenerates one section of a finished job as a new job
+    that reuses the other sections; each section's version is kept in the
+    row so get() can report the artifacts the exports are keyed by.
+
+    A maintenance thread touches the jobs this process owns every
+    HEARTBEAT_INTERVAL seconds, even while they wait for a worker or the
+    rate limiter, and periodically fails jobs whose owner stopped touching
+    them and deletes finished jobs past retention.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            topic TEXT NOT NULL,
+            level TEXT NOT NULL,
+            options TEXT NOT NULL,
+            status TEXT NOT NULL,
+            sections TEXT NOT NULL,
+            partial TEXT NOT NULL,
+            versions TEXT NOT NULL DEFAULT '{}',
+            trace TEXT,
+            pdf BLOB,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)",
+    )
+
+    def __init__(self, pipeline, bundle_generator=None, max_workers=DEFAULT_MAX_WORKERS,
+                 max_queue_depth=DEFAULT_MAX_QUEUE_DEPTH, path=None, prefetcher=None):
+        super().__init__(path)
+        self.pipeline = pipeline
+        self.bundle_generator = bundle_generator
+        self.prefetcher = prefetcher
+        self.max_queue_depth = max_queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="study-job")
+        self._pending = 0
+        self._active = set()
+        self._lock = threading.Lock()
+        self._migrate()
+        self._cleanup()
+        threading.Thread(target=self._maintain, name="study-job-maintenance", daemon=True).start()
+
+    def submit(self, topic, level, include_examples=True, include_quiz=True, bundle=False):
+        """Queue a generation job and return its ID; raises QueueFullError under backpressure."""
+        options = {"include_examples": include_examples, "include_quiz": include_quiz, "bundle": bundle}
+        return self._enqueue(topic, level, options, {}, {}, self._run)
+
+    def submit_section(self, job_id, section):
+        """Queue a job that regenerates one section of a finished job and reuses the others.
+
+        Returns the new job's ID, or None if job_id is unknown or not finished.
+        Raises QueueFullError under backpressure like submit().
+        """
+        if section not in SECTION_GENERATORS:
+            raise ValueError(f"Unknown section: {section}")
+        row = self._connection().execute(
+            "SELECT topic, level, options, sections, versions FROM jobs WHERE id = ? AND status = 'done'",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        topic, level, options, sections, versions = row
+        sections = json.loads(sections)
+        versions = json.loads(versions)
+        sections.pop(section, None)
+        return self._enqueue(
+            topic, level, json.loads(options), sections, versions,
+            lambda new_id, *args: self._run_section(new_id, section, *args),
+        )
+
+    def get(self, job_id):
+        """Return the job's status, finished sections and streamed partial text, or None if unknown."""
+        row = self._connection().execute(
+            "SELECT topic, level, options, status, sections, partial, versions, trace, error, pdf IS NOT NULL, "
+            "updated_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        topic, level, options, status, sections, partial, versions, trace, error, has_pdf, updated_at = row
+        sections = json.loads(sections)
+        return {
+            "id": job_id,
+            "topic": topic,
+            "level": level,
+            "options": json.loads(options),
+            "status": status,
+            "sections": sections,
+            "partial": json.loads(partial),
+            "artifacts": make_artifacts(sections, json.loads(versions)),
+            "trace": json.loads(trace) if trace else None,
+            "error": error,
+            "has_pdf": bool(has_pdf),
+            "updated_at": updated_at,
+        }
+
+    def get_pdf(self, job_id):
+        row = self._connection().execute("SELECT pdf FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bytes(row[0]) if row and row[0] is not None else None
+
+    @staticmethod
+    def is_stale(job):
+        """True if an active job has not been touched for STALE_SECONDS, so its worker is gone."""
+        return job["status"] in ACTIVE_STATUSES and time.time() - job["updated_at"] > STALE_SECONDS
+
+    def depth(self):
+        with self._lock:
+            return self._pending
+
+    def _enqueue(self, topic, level, options, sections, versions, run):
+        with self._lock:
+            if self._pending >= self.max_queue_depth:
+                raise QueueFullError("Too many generation jobs in progress, please try again shortly")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, topic, level, options, status, sections, partial, versions, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, '{}', ?, ?, ?)",
+            (job_id, topic, level, json.dumps(options), json.dumps(sections), json.dumps(versions), now, now),
+        )
+        with self._lock:
+            self._active.add(job_id)
+        try:
+            self.executor.submit(run, job_id, topic, level, options, sections, versions)
+        except Exception:
+            self._finished(job_id)
+            raise
+        return job_id
+
+    def _run(self, job_id, topic, level, options, sections, versions):
+        try:
+            self._update(job_id, status="running")
+            with metrics.trace() as request_trace:
+                sections = self._generate(job_id, topic, level, options)
+                versions = {section: 1 for section in SECTIONS}
+                self._complete(job_id, topic, level, sections, versions, request_trace)
+            if self.prefetcher is not None:
+                self.prefetcher.record_request(topic, level)
+                self.prefetcher.prefetch_levels(topic, level, **options)
+        except Exception as e:
+            logger.warning(f"Generation job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            self._finished(job_id)
+
+    def _run_section(self, job_id, section, topic, level, options, sections, versions):
+        """Regenerate one section, bypassing the cache, and bump only that section's version."""
+        try:
+            self._update(job_id, status="running")
+            generator, method = SECTION_GENERATORS[section]
+            generate = getattr(self.pipeline.generators[generator], method)
+            with metrics.trace() as request_trace:
+                if section == "quiz":
+                    # Quizzes are drawn fresh from the bank or the API on every call
+                    sections[section] = generate(topic, level)
+                else:
+                    sections[section] = generate(topic, level, refresh=True)
+                versions = dict(versions, **{section: versions.get(section, 1) + 1})
+                self._complete(job_id, topic, level, sections, versions, request_trace)
+        except Exception as e:
+            logger.warning(f"Regenerating {section} for job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            self._finished(job_id)
+
+    def _complete(self, job_id, topic, level, sections, versions, request_trace):
+        """Render the PDF for the finished sections and mark the job done."""
+        key = export_key(topic, level, make_artifacts(sections, versions))
+        pdf_data = NotesFormatter.render_pdf(
+            topic, level, sections["content"], sections["examples"], sections["quiz"], key=key
+        )
+        self._update(
+            job_id,
+            status="done",
+            sections=json.dumps(sections),
+            partial="{}",
+            versions=json.dumps(versions),
+            trace=json.dumps(request_trace.summary(), default=str),
+            pdf=pdf_data,
+        )
+
+    def _generate(self, job_id, topic, level, options):
+        include_examples = options["include_examples"]
+        include_quiz = options["include_quiz"]
+        if options["bundle"] and self.bundle_generator is not None:
+            return self.bundle_generator.generate_bundle(topic, level, include_examples, include_quiz)
+
+        sections = {}
+        partial = {}
+        last_write = 0.0
+        for section, event, value in self.pipeline.stream(topic, level, include_examples, include_quiz):
+            if event == "delta":
+                if section == "quiz":
+                    partial.setdefault(section, []).append(value)
+                else:
+                    partial[section] = partial.get(section, "") + value
+                # Throttle writes of streamed text; finished sections are written immediately
+                if time.monotonic() - last_write < PROGRESS_INTERVAL:
+                    continue
+            else:
+                sections[section] = value
+                partial.pop(section, None)
+            self._update(job_id, sections=json.dumps(sections), partial=json.dumps(partial))
+            last_write = time.monotonic()
+        return sections
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connection().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+        )
+
+    def _finished(self, job_id):
+        with self._lock:
+            self._pending -= 1
+            self._active.discard(job_id)
+
+    def _maintain(self):
+        last_cleanup = time.monotonic()
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self._heartbeat()
+                if time.monotonic() - last_cleanup >= CLEANUP_INTERVAL:
+                    self._cleanup()
+                    last_cleanup = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Job maintenance failed: {e}")
+
+    def _heartbeat(self):
+        with self._lock:
+            active = list(self._active)
+        if not active:
+            return
+        placeholders = ", ".join("?" for _ in active)
+        self._connection().execute(
+            f"UPDATE jobs SET updated_at = ? WHERE id IN ({placeholders}) AND status IN (?, ?)",
+            (time.time(), *active, *ACTIVE_STATUSES),
+        )
+
+    def _migrate(self):
+        """Add columns introduced after a jobs table was first created."""
+        conn = self._connection()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "versions" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN versions TEXT NOT NULL DEFAULT '{}'")
+
+    def _cleanup(self):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Worker stopped before the job finished' "
+            "WHERE status IN (?, ?) AND updated_at < ?",
+            (*ACTIVE_STATUSES, now - STALE_SECONDS),
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (now - RETENTION_SECONDS,),
+        )
@@ -0,0 +1,249 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("generation")
+
+DEFAULT_LOG_LEVEL = "INFO"
+
+
+def configure_logging(level=None, stream=None):
+    """Send the generation logger to stderr at STUDY_LOG_LEVEL (default INFO), once per process.
+
+    Called by the app and command-line entry points rather than on import,
+    so hosts embedding the package keep control of its logging. Events are
+    JSON lines, so they are written as-is without a prefix. Set
+    STUDY_LOG_LEVEL=WARNING to keep only errors and warnings.
+    """
+    if any(getattr(h, "_study_handler", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler._study_handler = True
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel((level or os.environ.get("STUDY_LOG_LEVEL", DEFAULT_LOG_LEVEL)).upper())
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Recent observations kept per histogram for quantile estimates
+RECENT_SAMPLES = 512
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append((time.monotonic(), value))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, exportable in Prometheus text format."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def quantile(self, name, q, max_age=None, **labels):
+        """Estimate quantile q (0-1) of a histogram from its recent observations, or None if empty.
+
+        max_age limits the estimate to observations from the last max_age seconds.
+        """
+        samples = sorted(self._recent(name, max_age, labels))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def sample_count(self, name, max_age=None, **labels):
+        return len(self._recent(name, max_age, labels))
+
+    def _recent(self, name, max_age, labels):
+        with self._lock:
+            histogram = self._histograms.get((name, _label_key(labels)))
+            recent = list(histogram.recent) if histogram else []
+        if max_age is not None:
+            cutoff = time.monotonic() - max_age
+            recent = [(at, value) for at, value in recent if at >= cutoff]
+        return [value for _, value in recent]
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.count, h.sum)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.extend(self._header(name, "counter"))
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (counts, count, total) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.extend(self._header(name, "histogram"))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, metric_type):
+        lines = []
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        return lines
+
+
+class RequestTrace:
+    """Events recorded while handling one user request, for the debug panel."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        with self._lock:
+            events = list(self.events)
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "total_tokens": sum(e.get("total_tokens", 0) for e in events),
+            "events": events,
+        }
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("generation_call_seconds", "Wall time of generator calls")
+REGISTRY.describe("generation_first_token_seconds", "Time to the first streamed chunk")
+REGISTRY.describe("generation_cache_requests_total", "Response cache lookups by result")
+REGISTRY.describe("artifact_store_requests_total", "Shared artifact store lookups by result")
+REGISTRY.describe("generation_fallbacks_total", "Fallback content served instead of a model response")
+REGISTRY.describe("generation_tokens_total", "Tokens reported by chat_completion.usage")
+REGISTRY.describe("generation_truncated_total", "Completions cut off at max_tokens, which are never cached")
+REGISTRY.describe("groq_completion_seconds", "Wall time of complete Groq responses, including streamed bodies")
+REGISTRY.describe("routing_downgrades_total", "Requests moved to the fast model because the routed model missed its latency SLO")
+REGISTRY.describe("groq_request_seconds", "Wall time of individual Groq API attempts; streamed ones end when the headers arrive")
+REGISTRY.describe("groq_retries_total", "Groq API attempts that were retried")
+REGISTRY.describe("groq_hedged_requests_total", "Duplicate Groq requests sent after the p95 latency")
+REGISTRY.describe("groq_hedge_wins_total", "Hedged Groq requests that answered before the original")
+REGISTRY.describe("circuit_transitions_total", "Circuit breaker state changes")
+REGISTRY.describe("circuit_rejections_total", "Groq calls skipped because the circuit breaker was open")
+REGISTRY.describe("rate_limit_wait_seconds", "Time requests waited for rate-limit capacity")
+REGISTRY.describe("rate_limit_shed_total", "Requests shed because rate-limit capacity did not free up in time")
+REGISTRY.describe("prefetch_tasks_total", "Background prefetches by outcome")
+REGISTRY.describe("quiz_parse_failures_total", "Quiz responses, or questions within them, that could not be parsed")
+REGISTRY.describe("quiz_top_ups_total", "Follow-up requests for the questions missing from a partly usable quiz")
+REGISTRY.describe("quiz_bank_requests_total", "Quiz requests served from the question bank or sent to top it up")
+REGISTRY.describe("pdf_render_seconds", "Time spent rendering PDFs")
+REGISTRY.describe("api_request_seconds", "HTTP API time spent waiting for and running generation, by endpoint")
+REGISTRY.describe("api_rejections_total", "HTTP API requests refused with 503 because the wait queue was full")
+
+_current_trace = contextvars.ContextVar("generation_trace", default=None)
+
+
+@contextlib.contextmanager
+def trace():
+    """Collect the events of everything run in this context into a RequestTrace."""
+    request_trace = RequestTrace()
+    token = _current_trace.set(request_trace)
+    try:
+        yield request_trace
+    finally:
+        _current_trace.reset(token)
+
+
+def record(event, **fields):
+    """Log a structured event and attach it to the current request trace, if any."""
+    fields["event"] = event
+    logger.info(json.dumps(fields, default=str))
+    request_trace = _current_trace.get()
+    if request_trace is not None:
+        request_trace.add(fields)
+
+
+@contextlib.contextmanager
+def timed(name, **labels):
+    """Observe the wall time of the block in histogram name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, **labels)
+
+
+def record_usage(kind, model, usage):
+    """Count prompt, completion and total tokens from a completion's usage block."""
+    if usage is None:
+        return {}
+    tokens = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+    for token_type, value in tokens.items():
+        REGISTRY.inc("generation_tokens_total", value, kind=kind, model=model, type=token_type.replace("_tokens", ""))
+    return tokens
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+_FILLER = (
+    "builds on a small set of core ideas that connect to one another. "
+    "Understanding how those ideas interact makes it easier to apply them in practice. "
+    "Practitioners combine these principles with careful analysis of trade-offs. "
+)
+
+
+class MockAPIError(Exception):
+    """Error raised by MockGroq, shaped like the SDK's APIStatusError."""
+
+    def __init__(self, message, status_code, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class MockGroq:
+    """In-process stand-in for the Groq SDK client's chat-completions API.
+
+    Pass it to GroqClient(client=MockGroq(...)) or set STUDY_MOCK_BACKEND=1 to
+    make get_client() use one configured from STUDY_MOCK_* environment
+    variables. Latency, jitter, streaming chunk rate and failure rates are all
+    configurable so performance can be measured without spending API quota.
+    """
+
+    def __init__(self, latency=0.3, jitter=0.1, chunk_interval=0.01, chunk_size=24, response_words=250,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, malformed_json_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_interval = chunk_interval
+        self.chunk_size = chunk_size
+        self.response_words = response_words
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_json_rate = malformed_json_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @classmethod
+    def from_env(cls):
+        def option(name, default, cast=float):
+            value = os.environ.get(f"STUDY_MOCK_{name}")
+            return cast(value) if value else default
+
+        return cls(
+            latency=option("LATENCY", 0.3),
+            jitter=option("JITTER", 0.1),
+            chunk_interval=option("CHUNK_INTERVAL", 0.01),
+            error_rate=option("ERROR_RATE", 0.0),
+            rate_limit_rate=option("RATE_LIMIT_RATE", 0.0),
+            malformed_json_rate=option("MALFORMED_JSON_RATE", 0.0),
+            seed=option("SEED", None, int),
+        )
+
+    def create(self, messages, model, stream=False, timeout=None, response_format=None, **params):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            roll = self._random.random()
+            malformed = self._random.random() < self.malformed_json_rate
+
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise MockAPIError("Request timed out", 408)
+        time.sleep(delay)
+
+        if roll < self.rate_limit_rate:
+            raise MockAPIError(
+                "Rate limit reached", 429,
+                {"retry-after": str(self.retry_after), "x-ratelimit-reset-requests": f"{self.retry_after}s"},
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise MockAPIError("Internal server error", 500)
+
+        prompt = messages[-1]["content"]
+        text, finish_reason = self._response_text(prompt, response_format, malformed, params.get("max_tokens"))
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(text) // 4,
+            total_tokens=(len(prompt) + len(text)) // 4,
+        )
+        if stream:
+            return self._stream(text, model, usage, finish_reason)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+            usage=usage,
+        )
+
+    def _stream(self, text, model, usage, finish_reason="stop"):
+        for start in range(0, len(text), self.chunk_size):
+            time.sleep(self.chunk_interval)
+            delta = SimpleNamespace(content=text[start:start + self.chunk_size])
+            yield SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+        # Like Groq, report usage on a final empty chunk under x_groq
+        delta = SimpleNamespace(content=None)
+        yield SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)],
+            x_groq=SimpleNamespace(usage=usage),
+        )
+
+    def _response_text(self, prompt, response_format, malformed, max_tokens=None):
+        """Return (text, finish_reason) for a request; cut-off responses finish with "length"."""
+        if response_format and response_format.get("type") == "json_object":
+            text = json.dumps({
+                "explanation": self._prose(prompt),
+                "examples": self._examples(prompt),
+                "quiz": self._questions(prompt),
+                "questions": self._questions(prompt),
+            })
+        elif "quiz" in prompt.lower() and "json" in prompt.lower():
+            text = "Here are the questions:\n" + json.dumps(self._questions(prompt), indent=2)
+        else:
+            prose = self._prose(prompt)
+            # Prose is cut at the output budget, about four characters per token
+            if max_tokens and len(prose) > max_tokens * 4:
+                return prose[: max_tokens * 4], "length"
+            return prose, "stop"
+
+        if malformed:
+            # Cut the document off mid-way, as a truncated completion would be
+            return text[: len(text) // 2], "length"
+        return text, "stop"
+
+    def _prose(self, prompt):
+        words = (f"This material about the requested topic {_FILLER}" * 50).split()
+        return "\n\n".join(
+            " ".join(words[start:start + 60]) for start in range(0, self.response_words, 60)
+        )
+
+    def _examples(self, prompt):
+        return "\n\n".join(f"{i}. Example {i} {_FILLER}" for i in range(1, 4))
+
+    def _questions(self, prompt):
+        return [
+            {
+                "question": f"Mock question {i} ({self._random.randrange(10 ** 6)})?",
+                "options": [f"Option {j}" for j in range(1, 5)],
+                "correct": i % 4,
+                "explanation": f"Option {i % 4 + 1} is correct.",
+            }
+            for i in range(1, 4)
+        ]
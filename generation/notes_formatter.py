@@ -1,20 +1,32 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import datetime
+import io
+import threading
+import time
+
+from .artifacts import export_key, get_default_artifact_store, make_artifacts
+from .metrics import REGISTRY, logger, record
+
+# ReportLab is imported inside the PDF methods so app startup does not pay for it
 
 class NotesFormatter:
+    _styles = None
+    _lock = threading.Lock()
+    
     @staticmethod
     def format_markdown(content, examples, quiz_data=None):
         """Format content as markdown"""
         formatted = f"# Study Material\n\n"
-        formatted += f"## Explanation\n\n{content}\n\n"
-        formatted += f"## Examples\n\n{examples}\n\n"
+        formatted += NotesFormatter.format_markdown_sections(content, examples, quiz_data)
+        return formatted
+    
+    @staticmethod
+    def format_markdown_sections(content, examples, quiz_data=None, heading="##"):
+        """Format the explanation, examples and quiz as markdown sections under the given heading level"""
+        formatted = f"{heading} Explanation\n\n{content}\n\n"
+        formatted += f"{heading} Examples\n\n{examples}\n\n"
         
         if quiz_data:
-            formatted += "## Quiz Questions\n\n"
+            formatted += f"{heading} Quiz Questions\n\n"
             for i, q in enumerate(quiz_data, 1):
                 formatted += f"**Q{i}: {q['question']}**\n\n"
                 for j, opt in enumerate(q['options'], 1):
@@ -27,75 +39,157 @@ class NotesFormatter:
     @staticmethod
     def export_to_pdf(topic, level, content, examples, quiz_data, filename):
         """Export study material to PDF"""
+        pdf_data = NotesFormatter.render_pdf(topic, level, content, examples, quiz_data)
+        if pdf_data is None:
+            return False
         try:
-            doc = SimpleDocTemplate(filename, pagesize=letter)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor='#2C3E50',
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=16,
-                textColor='#34495E',
-                spaceAfter=12,
-                spaceBefore=12
-            )
-            
-            # Title
-            story.append(Paragraph("AI Study Material Generator", title_style))
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Topic and Level
-            story.append(Paragraph(f"<b>Topic:</b> {topic}", styles['Normal']))
-            story.append(Paragraph(f"<b>Difficulty Level:</b> {level}", styles['Normal']))
-            story.append(Paragraph(f"<b>Generated:</b> {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Content
-            story.append(Paragraph("Explanation", heading_style))
-            for para in content.split('\n\n'):
-                if para.strip():
-                    story.append(Paragraph(para.replace('\n', '<br/>'), styles['Normal']))
-                    story.append(Spacer(1, 0.1*inch))
-            
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Examples
-            story.append(Paragraph("Real-World Examples", heading_style))
-            for para in examples.split('\n\n'):
-                if para.strip():
-                    story.append(Paragraph(para.replace('\n', '<br/>'), styles['Normal']))
-                    story.append(Spacer(1, 0.1*inch))
-            
-            # Quiz
-            if quiz_data:
-                story.append(PageBreak())
-                story.append(Paragraph("Quiz Questions", heading_style))
-                
-                for i, q in enumerate(quiz_data, 1):
-                    story.append(Paragraph(f"<b>Question {i}:</b> {q['question']}", styles['Normal']))
-                    story.append(Spacer(1, 0.1*inch))
-                    
-                    for j, opt in enumerate(q['options'], 1):
-                        story.append(Paragraph(f"   {j}. {opt}", styles['Normal']))
-                    
-                    story.append(Spacer(1, 0.05*inch))
-                    story.append(Paragraph(f"<i>Correct Answer: Option {q['correct'] + 1}</i>", styles['Normal']))
-                    story.append(Paragraph(f"<i>Explanation: {q.get('explanation', 'N/A')}</i>", styles['Normal']))
-                    story.append(Spacer(1, 0.2*inch))
-            
-            doc.build(story)
+            with open(filename, 'wb') as f:
+                f.write(pdf_data)
             return True
         except Exception as e:
-            print(f"PDF generation error: {e}")
-            return False
\ No newline at end of file
+            logger.warning(f"PDF generation error: {e}")
+            return False
+    
+    @classmethod
+    def render_markdown(cls, topic, level, content, examples, quiz_data, key=None):
+        """Format study material as markdown, shared through the artifact store like render_pdf"""
+        key = key or cls.content_hash(topic, level, content, examples, quiz_data)
+        return get_default_artifact_store().get_or_build(
+            f"markdown:{key}", lambda: cls.format_markdown(content, examples, quiz_data)
+        )
+    
+    @classmethod
+    def render_pdf(cls, topic, level, content, examples, quiz_data, key=None, stored=None):
+        """Render study material to PDF bytes, shared through the artifact store by content hash
+        
+        key may be passed as artifacts.export_key() of the sections, which
+        is what content_hash() computes, to skip hashing the content again.
+        stored, if given, returns previously rendered bytes (or None) to use
+        before rendering again.
+        """
+        key = key or cls.content_hash(topic, level, content, examples, quiz_data)
+        
+        def build():
+            return (stored and stored()) or cls._render_pdf(topic, level, content, examples, quiz_data)
+        
+        return get_default_artifact_store().get_or_build(f"pdf:{key}", build)
+    
+    @classmethod
+    def _render_pdf(cls, topic, level, content, examples, quiz_data):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+        
+        started = time.perf_counter()
+        try:
+            buffer = io.BytesIO()
+            doc = SimpleDocTemplate(buffer, pagesize=letter)
+            doc.build(cls._build_story(topic, level, content, examples, quiz_data))
+            pdf_data = buffer.getvalue()
+        except Exception as e:
+            logger.warning(f"PDF generation error: {e}")
+            return None
+        seconds = time.perf_counter() - started
+        REGISTRY.observe("pdf_render_seconds", seconds)
+        record("pdf_render", seconds=round(seconds, 4), bytes=len(pdf_data))
+        return pdf_data
+    
+    @staticmethod
+    def content_hash(topic, level, content, examples, quiz_data):
+        """Stable hash of everything that affects the rendered document, built from the section hashes"""
+        sections = {"content": content, "examples": examples, "quiz": quiz_data or []}
+        return export_key(topic, level, make_artifacts(sections))
+    
+    @classmethod
+    def get_styles(cls):
+        """Build the stylesheet and custom paragraph styles once and reuse them"""
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        
+        with cls._lock:
+            if cls._styles is None:
+                styles = getSampleStyleSheet()
+                styles.add(ParagraphStyle(
+                    'CustomTitle',
+                    parent=styles['Heading1'],
+                    fontSize=24,
+                    textColor='#2C3E50',
+                    spaceAfter=30,
+                    alignment=TA_CENTER
+                ))
+                styles.add(ParagraphStyle(
+                    'CustomHeading',
+                    parent=styles['Heading2'],
+                    fontSize=16,
+                    textColor='#34495E',
+                    spaceAfter=12,
+                    spaceBefore=12
+                ))
+                cls._styles = styles
+            return cls._styles
+    
+    @classmethod
+    def _build_story(cls, topic, level, content, examples, quiz_data):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer
+        
+        styles = cls.get_styles()
+        title_style = styles['CustomTitle']
+        story = []
+        
+        # Title
+        story.append(Paragraph("AI Study Material Generator", title_style))
+        story.append(Spacer(1, 0.2*inch))
+        
+        # Topic and Level
+        story.append(Paragraph(f"<b>Topic:</b> {topic}", styles['Normal']))
+        story.append(Paragraph(f"<b>Difficulty Level:</b> {level}", styles['Normal']))
+        story.append(Paragraph(f"<b>Generated:</b> {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+        story.append(Spacer(1, 0.3*inch))
+        
+        story.extend(cls.section_flowables(content, examples, quiz_data))
+        return story
+    
+    @classmethod
+    def section_flowables(cls, content, examples, quiz_data):
+        """Flowables for the explanation, examples and quiz of one topic"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, PageBreak
+        
+        styles = cls.get_styles()
+        heading_style = styles['CustomHeading']
+        story = []
+        
+        # Content
+        story.append(Paragraph("Explanation", heading_style))
+        for para in content.split('\n\n'):
+            if para.strip():
+                story.append(Paragraph(para.replace('\n', '<br/>'), styles['Normal']))
+                story.append(Spacer(1, 0.1*inch))
+        
+        story.append(Spacer(1, 0.2*inch))
+        
+        # Examples
+        story.append(Paragraph("Real-World Examples", heading_style))
+        for para in examples.split('\n\n'):
+            if para.strip():
+                story.append(Paragraph(para.replace('\n', '<br/>'), styles['Normal']))
+                story.append(Spacer(1, 0.1*inch))
+        
+        # Quiz
+        if quiz_data:
+            story.append(PageBreak())
+            story.append(Paragraph("Quiz Questions", heading_style))
+            
+            for i, q in enumerate(quiz_data, 1):
+                story.append(Paragraph(f"<b>Question {i}:</b> {q['question']}", styles['Normal']))
+                story.append(Spacer(1, 0.1*inch))
+                
+                for j, opt in enumerate(q['options'], 1):
+                    story.append(Paragraph(f"   {j}. {opt}", styles['Normal']))
+                
+                story.append(Spacer(1, 0.05*inch))
+                story.append(Paragraph(f"<i>Correct Answer: Option {q['correct'] + 1}</i>", styles['Normal']))
+                story.append(Paragraph(f"<i>Explanation: {q.get('explanation', 'N/A')}</i>", styles['Normal']))
+                story.append(Spacer(1, 0.2*inch))
+        
+        return story
@@ -0,0 +1,109 @@
+import contextvars
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .metrics import logger
+
+SECTIONS = ("content", "examples", "quiz")
+LEVELS = ("Beginner", "Intermediate", "Advanced")
+
+
+class StudyMaterialPipeline:
+    def __init__(self, generators, max_workers=6):
+        self.generators = generators
+        # One bounded pool shared by every session using this pipeline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="study-gen")
+
+    def generate(self, topic, level, include_examples=True, include_quiz=True):
+        """Generate all sections in parallel, yielding (section, result) as each one finishes."""
+        calls = self._section_calls(topic, level)
+        if not include_examples:
+            calls.pop("examples")
+            yield "examples", ""
+        if not include_quiz:
+            calls.pop("quiz")
+            yield "quiz", []
+
+        # Each task runs in a copy of the caller's context so request traces follow it
+        futures = {
+            self.executor.submit(contextvars.copy_context().run, generate, topic, level): (section, fallback)
+            for section, (generate, fallback) in calls.items()
+        }
+        for future in as_completed(futures):
+            section, fallback = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Generators handle API errors themselves; this guards anything unexpected
+                logger.warning(f"Error generating {section}: {e}")
+                result = fallback(topic, level)
+            yield section, result
+
+    def generate_all(self, topic, level, include_examples=True, include_quiz=True):
+        """Generate all sections in parallel and return them as a dict."""
+        return dict(self.generate(topic, level, include_examples, include_quiz))
+
+    def stream(self, topic, level, include_examples=True, include_quiz=True):
+        """Generate all sections in parallel, yielding events as they happen.
+
+        Yields (section, "delta", text) for each streamed chunk of the explanation
+        and examples, (section, "delta", question) for each quiz question as it
+        completes, and (section, "done", result) once a section is complete.
+        """
+        calls = self._section_calls(topic, level)
+        streams = self._stream_calls()
+        if not include_examples:
+            calls.pop("examples")
+            yield "examples", "done", ""
+        if not include_quiz:
+            calls.pop("quiz")
+            yield "quiz", "done", []
+
+        events = queue.Queue()
+        for section, (generate, fallback) in calls.items():
+            run = streams.get(section, generate)
+            self.executor.submit(
+                contextvars.copy_context().run,
+                self._run_section, events, section, run, fallback, topic, level, section in streams,
+            )
+
+        remaining = len(calls)
+        while remaining:
+            section, event, value = events.get()
+            if event == "done":
+                remaining -= 1
+            yield section, event, value
+
+    def _run_section(self, events, section, run, fallback, topic, level, streamed):
+        """Run one section on a worker thread, reporting deltas and the final result to the events queue."""
+        try:
+            if streamed:
+                chunks = []
+                for chunk in run(topic, level):
+                    chunks.append(chunk)
+                    events.put((section, "delta", chunk))
+                # Quiz chunks are whole questions; the others are text
+                result = chunks if section == "quiz" else "".join(chunks)
+            else:
+                result = run(topic, level)
+        except Exception as e:
+            logger.warning(f"Error generating {section}: {e}")
+            result = fallback(topic, level)
+        events.put((section, "done", result))
+
+    def _stream_calls(self):
+        return {
+            "content": self.generators["content"].stream_content,
+            "examples": self.generators["example"].stream_examples,
+            "quiz": self.generators["quiz"].stream_quiz,
+        }
+
+    def _section_calls(self, topic, level):
+        content = self.generators["content"]
+        example = self.generators["example"]
+        quiz = self.generators["quiz"]
+        return {
+            "content": (content.generate_content, content._fallback_content),
+            "examples": (example.generate_examples, example._fallback_examples),
+            "quiz": (quiz.generate_quiz, quiz._fallback_quiz),
+        }
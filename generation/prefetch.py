@@ -0,0 +1,161 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .db import SQLiteStore
+from .metrics import REGISTRY, logger, record
+from .pipeline import LEVELS
+from .rate_limit import BACKGROUND, RateLimitExceeded, get_default_limiter, priority
+
+DEFAULT_WARM_TOPICS = 20
+
+# Request history older than this does not count towards popular topics
+HISTORY_SECONDS = 7 * 24 * 60 * 60
+
+
+class PrefetchCancelled(Exception):
+    pass
+
+
+class Prefetcher(SQLiteStore):
+    """Fills the cache ahead of requests that are likely to come next.
+
+    After a foreground generation, the other levels of the same topic are
+    generated in the background; warm_up() does the same for the most
+    requested topics in the recent history. Prefetches run at background
+    priority, so they are shed as soon as the rate budget gets tight, and
+    cancel() drops pending work and stops running tasks between sections.
+
+    Without a rate budget (GROQ_RPM / GROQ_TPM) nothing would ever be shed,
+    so schedule() does nothing unless the limiter has one.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS topic_requests (
+            canonical TEXT NOT NULL,
+            display TEXT NOT NULL,
+            level TEXT NOT NULL,
+            requested_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS topic_requests_time ON topic_requests (requested_at)",
+    )
+
+    def __init__(self, generators, max_workers=2, path=None, limiter=None):
+        super().__init__(path)
+        self.generators = generators
+        self.limiter = limiter if limiter is not None else get_default_limiter()
+        self.topics = generators["content"].topics
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="study-prefetch")
+        self._scheduled = {}
+        # Bumped by cancel(); tasks scheduled under an older epoch stop at their next section
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._schedule_stop = None
+
+    def record_request(self, topic, level):
+        """Add a foreground request to the history that warm_up() ranks topics by."""
+        canonical, display = self.topics.canonicalize(topic)
+        self._connection().execute(
+            "INSERT INTO topic_requests (canonical, display, level, requested_at) VALUES (?, ?, ?, ?)",
+            (canonical, display, level, time.time()),
+        )
+
+    def prefetch_levels(self, topic, level, include_examples=True, include_quiz=True, bundle=False):
+        """Schedule generation of the levels of topic other than the one just requested."""
+        for other in LEVELS:
+            if other != level:
+                self.schedule(topic, other, include_examples, include_quiz, bundle)
+
+    def warm_up(self, limit=DEFAULT_WARM_TOPICS):
+        """Schedule every level of the limit most requested recent topics; returns the topics."""
+        conn = self._connection()
+        conn.execute("DELETE FROM topic_requests WHERE requested_at < ?", (time.time() - HISTORY_SECONDS,))
+        rows = conn.execute(
+            "SELECT MAX(display) FROM topic_requests GROUP BY canonical ORDER BY COUNT(*) DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        topics = [display for (display,) in rows]
+        for topic in topics:
+            for level in LEVELS:
+                self.schedule(topic, level)
+        record("prefetch_warm_up", topics=len(topics))
+        return topics
+
+    def start_schedule(self, interval, limit=DEFAULT_WARM_TOPICS):
+        """Run warm_up() now and then every interval seconds on a daemon thread."""
+        stop = threading.Event()
+        self._schedule_stop = stop
+
+        def loop():
+            while True:
+                try:
+                    self.warm_up(limit)
+                except Exception as e:
+                    logger.warning(f"Prefetch warm-up failed: {e}")
+                if stop.wait(interval):
+                    return
+
+        threading.Thread(target=loop, name="study-prefetch-schedule", daemon=True).start()
+
+    def schedule(self, topic, level, include_examples=True, include_quiz=True, bundle=False):
+        """Queue one background prefetch unless the same one is already pending or there is no rate budget."""
+        if not self.limiter.buckets:
+            return
+        canonical, _ = self.topics.canonicalize(topic)
+        key = (canonical, level, include_examples, include_quiz, bundle)
+        with self._lock:
+            if key in self._scheduled:
+                return
+            self._scheduled[key] = self.executor.submit(
+                self._run, self._epoch, key, topic, level, include_examples, include_quiz, bundle
+            )
+
+    def cancel(self):
+        """Drop pending prefetches, stop running ones at their next section and stop the warm-up schedule."""
+        with self._lock:
+            self._epoch += 1
+            for future in self._scheduled.values():
+                future.cancel()
+            self._scheduled.clear()
+        if self._schedule_stop is not None:
+            self._schedule_stop.set()
+        record("prefetch_cancelled")
+
+    def pending(self):
+        with self._lock:
+            return len(self._scheduled)
+
+    def _run(self, epoch, key, topic, level, include_examples, include_quiz, bundle):
+        result = "done"
+        try:
+            with priority(BACKGROUND):
+                for generator in self._generators(include_examples, include_quiz, bundle):
+                    if epoch != self._epoch:
+                        raise PrefetchCancelled()
+                    generator.prefetch(topic, level)
+        except PrefetchCancelled:
+            result = "cancelled"
+        except RateLimitExceeded:
+            # Foreground traffic needs the budget; the next request or warm-up will try again
+            result = "shed"
+        except Exception as e:
+            logger.warning(f"Prefetch of {topic} ({level}) failed: {e}")
+            result = "failed"
+        finally:
+            with self._lock:
+                # After a cancel() the key may already belong to a newer task
+                if epoch == self._epoch:
+                    self._scheduled.pop(key, None)
+        REGISTRY.inc("prefetch_tasks_total", result=result)
+        record("prefetch", topic=topic, level=level, result=result)
+
+    def _generators(self, include_examples, include_quiz, bundle):
+        if bundle and "bundle" in self.generators:
+            return [self.generators["bundle"]]
+        generators = [self.generators["content"]]
+        if include_examples:
+            generators.append(self.generators["example"])
+        if include_quiz:
+            generators.append(self.generators["quiz"])
+        return generators
+
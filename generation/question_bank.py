@@ -0,0 +1,132 @@
+import hashlib
+import json
+import threading
+import time
+
+from .db import SQLiteStore
+from .topics import jaccard, normalize_text, same_words, shingles
+
+# Options every banked question must have, matching what the quiz prompts ask for
+OPTIONS_PER_QUESTION = 4
+
+# Questions at least this similar to a banked one, with the same words up to typos, are treated as duplicates
+DEFAULT_DUPLICATE_THRESHOLD = 0.85
+
+
+def is_valid_question(question):
+    """Check a quiz question has text, at least two options and an in-range answer index."""
+    if not isinstance(question, dict) or not isinstance(question.get("question"), str):
+        return False
+    options = question.get("options")
+    if not isinstance(options, list) or len(options) < 2:
+        return False
+    if not all(isinstance(opt, str) and opt.strip() for opt in options):
+        return False
+    correct = question.get("correct")
+    return isinstance(correct, int) and not isinstance(correct, bool) and 0 <= correct < len(options)
+
+
+class QuestionBank(SQLiteStore):
+    """Persistent, deduplicated quiz questions indexed by canonical topic and level."""
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            topic TEXT NOT NULL,
+            level TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            correct INTEGER NOT NULL,
+            explanation TEXT,
+            created_at REAL NOT NULL,
+            UNIQUE (topic, level, fingerprint)
+        )""",
+    )
+
+    def __init__(self, path=None, duplicate_threshold=DEFAULT_DUPLICATE_THRESHOLD):
+        super().__init__(path)
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def fingerprint(question):
+        return hashlib.sha256(normalize_text(question["question"]).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_bankable(question):
+        """Questions must be valid, have the expected option count and no repeated options."""
+        if not is_valid_question(question):
+            return False
+        options = [normalize_text(opt) for opt in question["options"]]
+        return len(options) == OPTIONS_PER_QUESTION and len(set(options)) == len(options)
+
+    def add(self, topic, level, questions):
+        """Insert valid, non-duplicate questions and return how many were added."""
+        candidates = [q for q in questions if self.is_bankable(q)]
+        if not candidates:
+            return 0
+
+        def insert(conn):
+            existing = [
+                (normalize_text(text), shingles(normalize_text(text)))
+                for (text,) in conn.execute(
+                    "SELECT question FROM questions WHERE topic = ? AND level = ?", (topic, level)
+                )
+            ]
+            added = 0
+            for q in candidates:
+                q_text = normalize_text(q["question"])
+                q_shingles = shingles(q_text)
+                # Trigrams alone match "Which is NOT a ..." to "Which is a ...", so the words must agree too
+                if any(
+                    jaccard(q_shingles, other_shingles) >= self.duplicate_threshold and same_words(q_text, other_text)
+                    for other_text, other_shingles in existing
+                ):
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO questions "
+                    "(topic, level, fingerprint, question, options, correct, explanation, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (topic, level, self.fingerprint(q), q["question"], json.dumps(q["options"]),
+                     q["correct"], q.get("explanation"), time.time()),
+                )
+                if cursor.rowcount:
+                    existing.append((q_text, q_shingles))
+                    added += 1
+            return added
+
+        return self._transaction(insert)
+
+    def count(self, topic, level):
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM questions WHERE topic = ? AND level = ?", (topic, level)
+        ).fetchone()
+        return count
+
+    def sample(self, topic, level, n):
+        """Return n random distinct questions for topic and level in the quiz UI's shape."""
+        rows = self._connection().execute(
+            "SELECT question, options, correct, explanation FROM questions "
+            "WHERE topic = ? AND level = ? ORDER BY RANDOM() LIMIT ?",
+            (topic, level, n),
+        ).fetchall()
+        quiz_data = []
+        for question, options, correct, explanation in rows:
+            q = {"question": question, "options": json.loads(options), "correct": correct}
+            if explanation is not None:
+                q["explanation"] = explanation
+            quiz_data.append(q)
+        return quiz_data
+
+
+_default_bank = None
+_default_bank_lock = threading.Lock()
+
+
+def get_default_question_bank():
+    """Return the process-wide question bank."""
+    global _default_bank
+    with _default_bank_lock:
+        if _default_bank is None:
+            _default_bank = QuestionBank()
+        return _default_bank
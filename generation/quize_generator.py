@@ -1,61 +1,305 @@
-
-import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
+import os
+import time
+
+from .base import BaseGenerator, TruncatedResponseError
+from .circuit import CircuitOpenError
+from .metrics import REGISTRY, logger, record
+from .question_bank import get_default_question_bank, is_valid_question
+from .routing import DEFAULT_MODEL, JSON_MODE_MODELS
+
+QUESTIONS_PER_QUIZ = 3
+
+# Distinct banked questions needed before quizzes are served from the bank alone
+DEFAULT_BANK_MIN_SIZE = 9
 
-# Load environment variables from .env file
-load_dotenv()
+# Prompt templates by difficulty level
+PROMPTS = {
+    "Beginner": "Generate 3 multiple choice quiz questions about {topic} for beginners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a brief explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation.",
+    "Intermediate": "Generate 3 multiple choice quiz questions about {topic} for intermediate learners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a brief explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation.",
+    "Advanced": "Generate 3 multiple choice quiz questions about {topic} for advanced learners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a detailed explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation."
+}
 
-class QuizGenerator:
+# Appended to the prompt in JSON mode, which requires the response to be an object
+JSON_MODE_INSTRUCTION = ' Respond with a JSON object whose "questions" field is the array of questions.'
+
+
+class QuizStreamParser:
+    """Extract quiz questions from JSON text as it arrives.
+
+    feed() takes the next chunk of the response and returns the questions
+    whose closing brace it contained, so each one can be used before the
+    rest of the response exists. Both a bare array and a JSON-mode object
+    like {"questions": [...]} work, and complete questions are kept even
+    if the response is cut off or broken later on. Questions that fail
+    is_valid_question() are counted in invalid and skipped.
+    """
+    
     def __init__(self):
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.text = ""
+        self.invalid = 0
+        self._position = 0
+        self._starts = []
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk):
+        self.text += chunk
+        questions = []
+        for index in range(self._position, len(self.text)):
+            char = self.text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._starts.append(index)
+            elif char == "}" and self._starts:
+                question = self._question(self.text[self._starts.pop():index + 1])
+                if question is not None:
+                    questions.append(question)
+        self._position = len(self.text)
+        return questions
+    
+    def _question(self, raw):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            if '"question"' in raw:
+                self.invalid += 1
+            return None
+        if not isinstance(value, dict) or "question" not in value:
+            # An enclosing object, such as the JSON-mode wrapper
+            return None
+        if not is_valid_question(value):
+            self.invalid += 1
+            return None
+        return value
+
+
+class QuizGenerator(BaseGenerator):
+    kind = "quiz"
+    prompts = PROMPTS
+    
+    def __init__(self, bank=None, bank_min_size=None, **kwargs):
+        super().__init__(**kwargs)
+        self.bank = bank if bank is not None else get_default_question_bank()
+        self.bank_min_size = bank_min_size or int(os.environ.get("STUDY_QUIZ_BANK_MIN", DEFAULT_BANK_MIN_SIZE))
     
     def generate_quiz(self, topic, level):
-        """Generate quiz questions based on topic and difficulty using Groq API"""
+        """Generate quiz questions based on topic and difficulty, from the question bank when it has enough"""
+        canonical, _ = self.topics.canonicalize(topic)
+        banked = self.bank.count(canonical, level)
+        if banked >= self.bank_min_size:
+            REGISTRY.inc("quiz_bank_requests_total", result="hit")
+            record("quiz_bank", topic=canonical, level=level, result="hit")
+            return self.bank.sample(canonical, level, QUESTIONS_PER_QUIZ)
+        
+        REGISTRY.inc("quiz_bank_requests_total", result="top_up")
         try:
-            # Define prompt based on difficulty level
-            prompts = {
-                "Beginner": f"Generate 3 multiple choice quiz questions about {topic} for beginners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a brief explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation.",
-                "Intermediate": f"Generate 3 multiple choice quiz questions about {topic} for intermediate learners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a brief explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation.",
-                "Advanced": f"Generate 3 multiple choice quiz questions about {topic} for advanced learners. Each question should have 4 options (A, B, C, D) with one correct answer. Include the correct answer and a detailed explanation. Format as JSON with fields: question, options (array), correct (index 0-3), explanation."
-            }
-            
-            prompt = prompts.get(level, prompts["Beginner"])
-            
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model="llama-3.1-8b-instant",  # Using Llama 3.1 model
-            )
-            
-            response_text = chat_completion.choices[0].message.content
-            
-            # Extract JSON from the response
-            start_idx = response_text.find('[')
-            end_idx = response_text.rfind(']') + 1
-            
-            if start_idx != -1 and end_idx != 0:
-                json_str = response_text[start_idx:end_idx]
-                try:
-                    quiz_data = json.loads(json_str)
-                    return quiz_data
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, return fallback quiz
-                    print("Failed to parse JSON from Groq response")
-                    return self._fallback_quiz(topic, level)
-            else:
-                # If no JSON found, return fallback quiz
-                print("No JSON found in Groq response")
-                return self._fallback_quiz(topic, level)
+            # Skip the response cache: a repeat of an old response would add nothing to the bank
+            return self._cached(topic, level, self._request_and_bank(topic, level), refresh=True,
+                                lookup=self._banked_lookup(canonical, level, banked))
+        except ValueError as e:
+            # If no usable JSON came back, return fallback quiz
+            logger.warning(str(e))
+            self._record_fallback(topic, level, e)
+            return self._fallback_quiz(topic, level)
         except Exception as e:
             # Fallback to original quiz if API fails
-            print(f"Error generating quiz with Groq: {e}")
-            return self._fallback_quiz(topic, level)
+            logger.warning(f"Error generating quiz with Groq: {e}")
+            return self._recover(topic, level, e)
+    
+    def stream_quiz(self, topic, level):
+        """Yield quiz questions one at a time, each as soon as it is complete in the streamed response."""
+        canonical, _ = self.topics.canonicalize(topic)
+        banked = self.bank.count(canonical, level)
+        if banked >= self.bank_min_size:
+            REGISTRY.inc("quiz_bank_requests_total", result="hit")
+            record("quiz_bank", topic=canonical, level=level, result="hit")
+            yield from self.bank.sample(canonical, level, QUESTIONS_PER_QUIZ)
+            return
+        
+        REGISTRY.inc("quiz_bank_requests_total", result="top_up")
+        started = time.perf_counter()
+        key, prompt, route = self._resolve(topic, level)
+        # As in generate_quiz the response cache is skipped, but identical concurrent calls share one request
+        flight, leader = self.flight.acquire(key, self._banked_lookup(canonical, level, banked))
+        if not leader:
+            try:
+                questions = flight.wait(self.flight.lease_seconds)
+            except Exception as e:
+                yield from self._stale_or_recover(started, key, topic, level, e)
+                return
+            self._record_call(started, "api")
+            yield from questions
+            return
+
+        questions = []
+        try:
+            # Streamed without JSON mode, which Groq does not support for streams
+            parser = QuizStreamParser()
+            try:
+                for chunk in self._request_stream(prompt, **route.options()):
+                    for question in parser.feed(chunk):
+                        if len(questions) < QUESTIONS_PER_QUIZ:
+                            questions.append(question)
+                            yield question
+            except TruncatedResponseError:
+                # Questions completed before the cut-off are kept and topped up below
+                pass
+            self._check_parsed(parser, questions)
+            for question in self._top_up(prompt, list(questions), **route.options())[len(questions):]:
+                questions.append(question)
+                yield question
+        except Exception as e:
+            logger.warning(f"Error streaming quiz with Groq: {e}")
+            if not questions:
+                self.flight.finish(key, flight, error=e)
+                yield from self._stale_or_recover(started, key, topic, level, e)
+                return
+        except BaseException:
+            # A consumer abandoned the stream; waiting callers get an error instead of hanging
+            self.flight.finish(key, flight, error=RuntimeError("Stream was abandoned"))
+            raise
+        # Banked before the lease is released, so callers waiting in other processes find these questions
+        self.add_to_bank(topic, level, questions)
+        self.flight.finish(key, flight, value=questions)
+        # A partial quiz is served but never cached, so the next request asks again
+        self._store(key, level, route, questions)
+        self._record_call(started, "api")
+
+    def _cacheable(self, quiz_data):
+        """Only complete quizzes are cached; one left short by a failed top-up is served once."""
+        return len(quiz_data) == QUESTIONS_PER_QUIZ
+
+    def _stale_or_recover(self, started, key, topic, level, error):
+        """Quiz to serve when a streamed request failed: the stale cached quiz while the circuit is open, else _recover()."""
+        if isinstance(error, CircuitOpenError):
+            stale = self.cache.get(key, allow_stale=True)
+            if stale is not None:
+                self._record_call(started, "stale")
+                return stale
+        return self._recover(topic, level, error)
+    
+    def _recover(self, topic, level, error):
+        """Quiz to serve when the API failed: banked questions if there are enough, else the generic fallback."""
+        canonical, _ = self.topics.canonicalize(topic)
+        self._record_fallback(topic, level, error)
+        # Real banked questions beat the generic fallback, even if the bank is not yet full
+        if self.bank.count(canonical, level) >= QUESTIONS_PER_QUIZ:
+            return self.bank.sample(canonical, level, QUESTIONS_PER_QUIZ)
+        return self._fallback_quiz(topic, level)
+    
+    def prefetch(self, topic, level):
+        """Top up the question bank for topic and level with one quiz request, unless it is already full."""
+        canonical, _ = self.topics.canonicalize(topic)
+        banked = self.bank.count(canonical, level)
+        if banked >= self.bank_min_size:
+            return
+        # One request per prefetch; foreground requests fill the bank the rest of the way
+        self._cached(topic, level, self._request_and_bank(topic, level), refresh=True,
+                     lookup=self._banked_lookup(canonical, level, banked))
+    
+    def _request_and_bank(self, topic, level):
+        """Return a compute function for _cached() that requests a quiz and banks it.
+        
+        Banking inside compute means the questions are stored before the
+        single-flight lease is released.
+        """
+        def compute(prompt, **options):
+            quiz_data = self._request_quiz(prompt, **options)
+            self.add_to_bank(topic, level, quiz_data)
+            return quiz_data
+        return compute
+    
+    def _banked_lookup(self, canonical, level, banked):
+        """Single-flight lookup serving a quiz from the bank once it holds more than the banked questions seen before.
+        
+        Lets a caller waiting on another process's top-up use the questions
+        that process stored instead of sending its own request.
+        """
+        def lookup():
+            count = self.bank.count(canonical, level)
+            if count > banked and count >= QUESTIONS_PER_QUIZ:
+                return self.bank.sample(canonical, level, QUESTIONS_PER_QUIZ)
+            return None
+        return lookup
+    
+    def add_to_bank(self, topic, level, quiz_data):
+        """Store generated questions in the bank; invalid and duplicate ones are skipped."""
+        canonical, _ = self.topics.canonicalize(topic)
+        added = self.bank.add(canonical, level, quiz_data)
+        record("quiz_bank_insert", topic=canonical, level=level, offered=len(quiz_data), added=added)
+        return added
+    
+    def _request_quiz(self, prompt, model=DEFAULT_MODEL, **options):
+        """Request a quiz, keeping its valid questions and re-requesting only the missing ones.
+        
+        Raises ValueError if no valid question came back, so bad responses are never cached.
+        """
+        questions = self._request_questions(prompt, model, **options)
+        return self._top_up(prompt, questions, model, **options)
+    
+    def _request_questions(self, prompt, model=DEFAULT_MODEL, **options):
+        if model in JSON_MODE_MODELS:
+            prompt += JSON_MODE_INSTRUCTION
+            options["response_format"] = {"type": "json_object"}
+        try:
+            response_text = self._request(prompt, model=model, **options)
+        except TruncatedResponseError as e:
+            # Questions completed before the cut-off are kept; _top_up() asks for the rest
+            response_text = e.text
+        return self._parse_quiz(response_text)
+    
+    def _top_up(self, prompt, questions, model=DEFAULT_MODEL, **options):
+        """Request only the questions missing from a partly usable quiz; returns questions, extended."""
+        missing = QUESTIONS_PER_QUIZ - len(questions)
+        if missing <= 0:
+            return questions
+        REGISTRY.inc("quiz_top_ups_total")
+        record("quiz_top_up", missing=missing)
+        asked = "; ".join(q["question"] for q in questions)
+        follow_up = f"{prompt} Only {missing} more question(s) are needed, different from these: {asked}"
+        try:
+            extra = self._request_questions(follow_up, model, **options)
+        except Exception as e:
+            # The questions already parsed are still worth serving
+            logger.warning(f"Error topping up quiz with Groq: {e}")
+            return questions
+        seen = {q["question"] for q in questions}
+        for question in extra:
+            if len(questions) < QUESTIONS_PER_QUIZ and question["question"] not in seen:
+                seen.add(question["question"])
+                questions.append(question)
+        return questions
+    
+    @classmethod
+    def _parse_quiz(cls, response_text):
+        """Return up to QUESTIONS_PER_QUIZ valid questions from the response; raises ValueError if there are none."""
+        parser = QuizStreamParser()
+        questions = parser.feed(response_text)[:QUESTIONS_PER_QUIZ]
+        cls._check_parsed(parser, questions)
+        return questions
+    
+    @staticmethod
+    def _check_parsed(parser, questions):
+        if parser.invalid:
+            REGISTRY.inc("quiz_parse_failures_total", parser.invalid, reason="invalid_question")
+            record("quiz_parse_failure", reason="invalid_question", count=parser.invalid)
+        if questions:
+            return
+        reason = "invalid_json" if "{" in parser.text else "no_json"
+        REGISTRY.inc("quiz_parse_failures_total", reason=reason)
+        record("quiz_parse_failure", reason=reason)
+        if reason == "no_json":
+            raise ValueError("No JSON found in Groq response")
+        raise ValueError("Failed to parse JSON from Groq response")
     
     def _fallback_quiz(self, topic, level):
         """Fallback quiz when model is unavailable"""
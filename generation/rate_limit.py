@@ -0,0 +1,156 @@
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+from .db import SQLiteStore
+from .metrics import REGISTRY, record
+
+# Request priorities, most important first
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# Share of each bucket a priority may not dip into, kept for more important traffic
+RESERVES = {INTERACTIVE: 0.0, BATCH: 0.25, BACKGROUND: 0.5}
+
+# Seconds a request may wait for capacity before it is shed; None waits indefinitely
+MAX_WAITS = {INTERACTIVE: 10.0, BATCH: None, BACKGROUND: 0.0}
+
+# Completion length assumed when a request sets no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 1024
+
+# Fraction of the account quota the limiter hands out, leaving room for estimation error
+DEFAULT_HEADROOM = 0.9
+
+_current_priority = contextvars.ContextVar("generation_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is shed because capacity did not free up in time."""
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Run the block's Groq requests at the given priority."""
+    token = _current_priority.set(level)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority():
+    return _current_priority.get()
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough token cost of a request: about four characters per prompt token plus the completion budget."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + (max_tokens or DEFAULT_COMPLETION_ESTIMATE)
+
+
+class RateLimiter(SQLiteStore):
+    """Requests-per-minute and tokens-per-minute token buckets shared by every process on the host.
+
+    Bucket levels live in SQLite and are updated inside BEGIN IMMEDIATE
+    transactions, so all workers draw from the same budget. Lower priorities
+    must leave a reserve in each bucket, so interactive requests are served
+    first when capacity is short, and are shed sooner.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS rate_buckets (
+            name TEXT PRIMARY KEY,
+            level REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""",
+    )
+
+    def __init__(self, rpm=None, tpm=None, headroom=DEFAULT_HEADROOM, path=None):
+        super().__init__(path)
+        self.buckets = []
+        if rpm:
+            self.buckets.append(("requests", rpm * headroom, rpm * headroom / 60.0))
+        if tpm:
+            self.buckets.append(("tokens", tpm * headroom, tpm * headroom / 60.0))
+
+    def acquire(self, estimated_tokens, level=None):
+        """Block until one request and estimated_tokens are available, or raise RateLimitExceeded."""
+        if not self.buckets:
+            return
+        level = current_priority() if level is None else level
+        max_wait = MAX_WAITS[level]
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire(estimated_tokens, RESERVES[level])
+            if wait == 0:
+                waited = time.monotonic() - started
+                if waited > 0.01:
+                    REGISTRY.observe("rate_limit_wait_seconds", waited, priority=PRIORITY_NAMES[level])
+                return
+            waited = time.monotonic() - started
+            if max_wait is not None and waited + wait > max_wait:
+                REGISTRY.inc("rate_limit_shed_total", priority=PRIORITY_NAMES[level])
+                record("rate_limit_shed", priority=PRIORITY_NAMES[level], wait=round(wait, 2))
+                raise RateLimitExceeded(f"Rate limit budget exhausted; capacity frees up in {wait:.1f}s")
+            time.sleep(min(wait, 1.0))
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """Correct the tokens bucket once a response reports its real usage."""
+        if not any(name == "tokens" for name, _, _ in self.buckets) or actual_tokens is None:
+            return
+        self._connection().execute(
+            "UPDATE rate_buckets SET level = level + ? WHERE name = 'tokens'",
+            (estimated_tokens - actual_tokens,),
+        )
+
+    def _try_acquire(self, estimated_tokens, reserve):
+        """Take capacity if available and return 0, otherwise return seconds until it should be."""
+        costs = {"requests": 1, "tokens": estimated_tokens}
+
+        def take(conn):
+            now = time.time()
+            levels = {}
+            wait = 0.0
+            for name, capacity, rate in self.buckets:
+                row = conn.execute(
+                    "SELECT level, updated_at FROM rate_buckets WHERE name = ?", (name,)
+                ).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                levels[name] = level
+                # Oversized requests only need a full bucket, so they cannot wait forever
+                needed = min(costs[name] + reserve * capacity, capacity)
+                if level < needed:
+                    wait = max(wait, (needed - level) / rate)
+            if wait:
+                return wait
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                [(name, levels[name] - min(costs[name], capacity), now) for name, capacity, _ in self.buckets],
+            )
+            return 0.0
+
+        return self._transaction(take)
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter():
+    """Return the process-wide limiter configured from GROQ_RPM and GROQ_TPM; unset means unlimited."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rpm = os.environ.get("GROQ_RPM")
+            tpm = os.environ.get("GROQ_TPM")
+            _default_limiter = RateLimiter(
+                rpm=float(rpm) if rpm else None,
+                tpm=float(tpm) if tpm else None,
+                headroom=float(os.environ.get("GROQ_RATE_HEADROOM", DEFAULT_HEADROOM)),
+            )
+        return _default_limiter
@@ -0,0 +1,135 @@
+import collections
+import copy
+import json
+import os
+import threading
+
+from .metrics import REGISTRY, record
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+# Models that accept response_format={"type": "json_object"}; JSON mode cannot be combined with streaming
+JSON_MODE_MODELS = {DEFAULT_MODEL, LARGE_MODEL}
+
+# Settings per generator kind and level; "*" applies to every level of a kind
+DEFAULT_ROUTES = {
+    "content": {
+        "Beginner": {"max_tokens": 500, "temperature": 0.5},
+        "Intermediate": {"max_tokens": 900, "temperature": 0.6},
+        "Advanced": {"model": LARGE_MODEL, "max_tokens": 1500, "temperature": 0.6},
+    },
+    "examples": {
+        "Beginner": {"max_tokens": 500},
+        "Intermediate": {"max_tokens": 700},
+        "Advanced": {"max_tokens": 900},
+    },
+    # Quiz JSON is short and must stay parseable, so keep it tight and fairly deterministic
+    "quiz": {"*": {"max_tokens": 700, "temperature": 0.3}},
+    "bundle": {"*": {"max_tokens": 2500, "temperature": 0.5}},
+}
+
+# Words asked for per output token; English runs about 0.75, the rest is margin so responses end before max_tokens
+WORDS_PER_TOKEN = 0.6
+
+DEFAULT_SLO_WINDOW_SECONDS = 300
+DEFAULT_SLO_MIN_SAMPLES = 10
+
+
+class Route(collections.namedtuple("Route", ["model", "max_tokens", "temperature"])):
+    """Model and output budget for one request."""
+
+    def options(self):
+        """Keyword arguments for chat.completions.create; unset values are left to the API default."""
+        options = {"model": self.model}
+        if self.max_tokens is not None:
+            options["max_tokens"] = self.max_tokens
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        return options
+
+    def length_hint(self):
+        """Prompt suffix asking for a response that fits in max_tokens, or "" when there is no budget."""
+        if self.max_tokens is None:
+            return ""
+        return f" Keep the whole response under {int(self.max_tokens * WORDS_PER_TOKEN)} words."
+
+
+class RoutingPolicy:
+    """Chooses model, max_tokens and temperature per (kind, level).
+
+    Routes come from DEFAULT_ROUTES, overridden by a JSON file named by
+    STUDY_ROUTING_CONFIG:
+
+        {"default": {"model": "llama-3.1-8b-instant"},
+         "routes": {"content": {"Advanced": {"model": "llama-3.3-70b-versatile", "max_tokens": 1500}}},
+         "slo": {"p95_seconds": 6, "fast_model": "llama-3.1-8b-instant"}}
+
+    With an SLO configured, a route whose model's observed p95 completion
+    time over the last window exceeds the target is sent to the fast model
+    instead. Once the slow samples age out of the window the routed model is
+    tried again.
+    """
+
+    def __init__(self, routes=None, default=None, slo=None):
+        self.default = {"model": DEFAULT_MODEL, "max_tokens": None, "temperature": None}
+        self.default.update(default or {})
+        self.routes = copy.deepcopy(DEFAULT_ROUTES)
+        for kind, levels in (routes or {}).items():
+            for level, settings in levels.items():
+                self.routes.setdefault(kind, {}).setdefault(level, {}).update(settings)
+        self.slo = slo or {}
+
+    @classmethod
+    def from_env(cls):
+        config = {}
+        path = os.environ.get("STUDY_ROUTING_CONFIG")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        slo = config.get("slo") or {}
+        if os.environ.get("STUDY_LATENCY_SLO"):
+            slo = dict(slo, p95_seconds=float(os.environ["STUDY_LATENCY_SLO"]))
+        return cls(routes=config.get("routes"), default=config.get("default"), slo=slo)
+
+    def configured(self, kind, level):
+        """Return the route from configuration alone, ignoring the latency SLO."""
+        settings = dict(self.default)
+        levels = self.routes.get(kind, {})
+        settings.update(levels.get("*", {}))
+        settings.update(levels.get(level, {}))
+        return Route(settings["model"], settings["max_tokens"], settings["temperature"])
+
+    def route(self, kind, level):
+        """Return the route for a request, moved to the fast model if its model is missing the SLO."""
+        route = self.configured(kind, level)
+        target = self.slo.get("p95_seconds")
+        fast_model = self.slo.get("fast_model", DEFAULT_MODEL)
+        if not target or route.model == fast_model:
+            return route
+
+        window = self.slo.get("window_seconds", DEFAULT_SLO_WINDOW_SECONDS)
+        samples = REGISTRY.sample_count("groq_completion_seconds", max_age=window, model=route.model)
+        if samples < self.slo.get("min_samples", DEFAULT_SLO_MIN_SAMPLES):
+            return route
+        p95 = REGISTRY.quantile("groq_completion_seconds", 0.95, max_age=window, model=route.model)
+        if p95 <= target:
+            return route
+
+        REGISTRY.inc("routing_downgrades_total", kind=kind, model=route.model)
+        record("routing_downgrade", kind=kind, level=level, model=route.model, fast_model=fast_model,
+               p95=round(p95, 3), target=target)
+        return route._replace(model=fast_model)
+
+
+_default_policy = None
+_default_policy_lock = threading.Lock()
+
+
+def get_default_routing_policy():
+    """Return the process-wide routing policy loaded from the environment."""
+    global _default_policy
+    with _default_policy_lock:
+        if _default_policy is None:
+            _default_policy = RoutingPolicy.from_env()
+        return _default_policy
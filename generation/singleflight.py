@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+import uuid
+
+from .db import SQLiteStore
+
+
+class Flight:
+    """One in-flight call whose result is shared by every caller waiting on it."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for in-flight generation")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight(SQLiteStore):
+    """Coalesce concurrent identical calls so only one reaches the API.
+
+    Within a process, callers with the same key wait on the first caller's
+    Flight. Across processes on one host, the leader holds a lease row in the
+    shared SQLite database; other processes poll lookup() (normally the
+    response cache) until the leader's result appears or its lease lapses.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS leases (
+            key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+    )
+
+    def __init__(self, path=None, lease_seconds=120.0, poll_interval=0.25):
+        super().__init__(path)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, lookup=None):
+        """Return compute() for key, sharing one call among concurrent identical callers."""
+        flight, leader = self.acquire(key, lookup)
+        if not leader:
+            return flight.wait(self.lease_seconds)
+        try:
+            value = compute()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, value=value)
+        return value
+
+    def acquire(self, key, lookup=None):
+        """Join or start the flight for key, returning (flight, is_leader).
+
+        A leader must call finish() once it has a result or an error; a
+        follower calls flight.wait().
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+
+        try:
+            value = self._wait_for_lease(key, lookup)
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        if value is not None:
+            # Another process produced the result while we waited
+            self.finish(key, flight, value=value, release=False)
+            return flight, False
+        return flight, True
+
+    def finish(self, key, flight, value=None, error=None, release=True):
+        """Publish the leader's result to waiting callers and release the lease."""
+        if release:
+            self._connection().execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.value = value
+        flight.error = error
+        flight._done.set()
+
+    def _wait_for_lease(self, key, lookup):
+        """Take the cross-process lease, or return another process's result if one appears first."""
+        while True:
+            if self._try_lease(key):
+                # The previous holder may have finished between our cache miss and now
+                value = lookup() if lookup else None
+                if value is not None:
+                    self._connection().execute(
+                        "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+                    )
+                return value
+
+            value = lookup() if lookup else None
+            if value is not None:
+                return value
+            time.sleep(self.poll_interval)
+
+    def _try_lease(self, key):
+        now = time.time()
+
+        def take(conn):
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease_seconds),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(take)
+
+
+_default_flight = None
+_default_flight_lock = threading.Lock()
+
+
+def get_default_flight():
+    """Return the process-wide single-flight group shared by all generators."""
+    global _default_flight
+    with _default_flight_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
@@ -0,0 +1,192 @@
+"""Cold-start profiler and budget check for the Streamlit app.
+
+    python -m generation.startup --top 15 --cold-start-budget 8 --render-budget 4 --import-budget 1
+
+The app is started in a fresh interpreter with -X importtime and rendered
+once through Streamlit's AppTest harness, so nothing already imported by
+this process hides its cost. Prints the slowest imports and exits with
+status 1 when cold start or first render is over budget, or when importing
+the app's generation modules is slow or loads groq, httpx or reportlab, so
+CI and deploy scripts can run it as a check. tests/test_startup.py asserts
+the same budgets.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "streamlit_app.py")
+
+# Seconds from interpreter start until the first page has rendered
+DEFAULT_COLD_START_BUDGET = 8.0
+# Seconds for the first script run, including the app's own imports
+DEFAULT_RENDER_BUDGET = 4.0
+# Seconds to import the generation modules the app imports at startup
+DEFAULT_IMPORT_BUDGET = 1.0
+
+# Modules app/streamlit_app.py imports before its first render
+APP_MODULES = (
+    "generation.artifacts",
+    "generation.notes_formatter",
+    "generation.content_generator",
+    "generation.example_generator",
+    "generation.quize_generator",
+    "generation.metrics",
+    "generation.bundle_generator",
+    "generation.jobs",
+    "generation.pipeline",
+    "generation.prefetch",
+)
+
+# Dependencies that must stay unimported until the first API call or PDF export
+DEFERRED_MODULES = ("groq", "httpx", "reportlab")
+
+
+def parse_importtime(output):
+    """Parse -X importtime lines into dicts with module, depth, self and cumulative seconds."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # The header line labels the columns instead of holding numbers
+            continue
+        name = parts[2].rstrip()
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self": int(parts[0]) / 1e6,
+            "cumulative": int(parts[1]) / 1e6,
+        })
+    return modules
+
+
+def profile(app_path=APP_PATH, timeout=60.0):
+    """Start and render the app in a child interpreter; return its timings and import profile."""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            STUDY_CACHE_PATH=os.path.join(directory, "startup.sqlite3"),
+            STUDY_MOCK_BACKEND="1",
+            STUDY_PREFETCH="0",
+        )
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "generation.startup", "--child", app_path, str(timeout)],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            timeout=timeout * 2,
+        )
+        cold_start = time.perf_counter() - started
+
+    errors = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+    if proc.returncode != 0:
+        raise RuntimeError(f"App failed to start:\n{errors[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["cold_start"] = cold_start
+    result["modules"] = parse_importtime(proc.stderr)
+    return result
+
+
+def profile_imports(modules=APP_MODULES, timeout=60.0):
+    """Import modules in a fresh interpreter; return the seconds taken and which DEFERRED_MODULES got loaded."""
+    script = (
+        "import importlib, json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"for name in {list(modules)!r}:\n"
+        "    importlib.import_module(name)\n"
+        "seconds = time.perf_counter() - started\n"
+        f"loaded = [name for name in {list(DEFERRED_MODULES)!r} if name in sys.modules]\n"
+        "print(json.dumps({'seconds': seconds, 'loaded': loaded}))\n"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, STUDY_CACHE_PATH=os.path.join(directory, "imports.sqlite3"))
+        proc = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            timeout=timeout,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing the app modules failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def format_report(result, top=15):
+    lines = [
+        f"Cold start      {result['cold_start']:.2f}s",
+        f"  streamlit     {result['streamlit_import']:.2f}s",
+        f"  first render  {result['first_render']:.2f}s",
+        "",
+        f"{'top-level import':<50}{'cumulative ms':>15}{'self ms':>10}",
+    ]
+    top_level = sorted((m for m in result["modules"] if m["depth"] == 0), key=lambda m: -m["cumulative"])
+    for m in top_level[:top]:
+        lines.append(f"{m['module']:<50}{m['cumulative'] * 1000:>15.1f}{m['self'] * 1000:>10.1f}")
+    return "\n".join(lines)
+
+
+def _child(app_path, timeout):
+    """Runs inside the profiled interpreter: render the app once and print the timings as JSON."""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+    app = AppTest.from_file(app_path, default_timeout=timeout)
+    app.run()
+    rendered = time.perf_counter()
+    print(json.dumps({
+        "streamlit_import": imported - started,
+        "first_render": rendered - imported,
+        "exceptions": [str(e.value) for e in app.exception],
+    }))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        _child(argv[1], float(argv[2]))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Profile the Streamlit app's cold start against a time budget.")
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    parser.add_argument("--cold-start-budget", type=float, default=DEFAULT_COLD_START_BUDGET)
+    parser.add_argument("--render-budget", type=float, default=DEFAULT_RENDER_BUDGET)
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    try:
+        result = profile(args.app, args.timeout)
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"FAIL: {e}", file=sys.stderr)
+        return 1
+    print(format_report(result, args.top))
+
+    failures = []
+    imports = profile_imports(timeout=args.timeout)
+    if imports["loaded"]:
+        failures.append(f"importing the app modules loaded {', '.join(imports['loaded'])}")
+    if imports["seconds"] > args.import_budget:
+        failures.append(f"app module imports {imports['seconds']:.2f}s are over the {args.import_budget:.2f}s budget")
+    if result["exceptions"]:
+        failures.append(f"first render raised: {'; '.join(result['exceptions'])}")
+    if result["cold_start"] > args.cold_start_budget:
+        failures.append(f"cold start {result['cold_start']:.2f}s is over the {args.cold_start_budget:.2f}s budget")
+    if result["first_render"] > args.render_budget:
+        failures.append(f"first render {result['first_render']:.2f}s is over the {args.render_budget:.2f}s budget")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+
+from .db import SQLiteStore
+
+# Aliases applied after normalisation; extend with a JSON file via STUDY_TOPIC_ALIASES
+DEFAULT_ALIASES = {
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "dl": "deep learning",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "rl": "reinforcement learning",
+    "llm": "large language models",
+    "llms": "large language models",
+    "oop": "object oriented programming",
+    "dbms": "database management systems",
+    "os": "operating systems",
+}
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+
+# MinHash signature of BANDS * ROWS values, bucketed for locality-sensitive lookup
+BANDS = 16
+ROWS = 4
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(b"a%d" % i, digest_size=8).digest(), "big") % _MERSENNE_PRIME | 1,
+        int.from_bytes(hashlib.blake2b(b"b%d" % i, digest_size=8).digest(), "big") % _MERSENNE_PRIME,
+    )
+    for i in range(BANDS * ROWS)
+]
+
+# "+" and "#" are kept because they tell words apart: C, C++ and C#
+_PUNCTUATION = re.compile(r"[^\w+#]+|_+", re.UNICODE)
+
+# Words shorter than this must match exactly in a fuzzy match; longer ones may differ by one typo
+MIN_TYPO_WORD_LENGTH = 5
+
+
+def normalize_text(text):
+    """Fold case, unicode forms, punctuation and whitespace of any text: " Machine-Learning!" -> "machine learning"."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _PUNCTUATION.sub(" ", text).strip()
+
+
+def normalize_topic(topic):
+    """Normalise a topic for canonicalisation; topic-specific folding belongs here rather than in normalize_text."""
+    return normalize_text(topic)
+
+
+def _within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    a, b = a[prefix:], b[prefix:]
+    if len(a) == len(b):
+        return a[1:] == b[1:] or (len(a) >= 2 and a[0] == b[1] and a[1] == b[0] and a[2:] == b[2:])
+    return a[1:] == b if len(a) > len(b) else b[1:] == a
+
+
+def same_words(a, b):
+    """True if two normalised texts have the same words up to a typo in a long word.
+
+    Trigram similarity alone merges texts that share most of their letters
+    ("supervised" and "unsupervised learning", "which is a" and "which is
+    not a"), so fuzzy matches of topics and of quiz questions must also
+    pass this check. An added prefix is at least two edits, and words with
+    digits or symbols ("python 2", "c++") must match exactly.
+    """
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    for word_a, word_b in zip(words_a, words_b):
+        if word_a == word_b:
+            continue
+        if not (word_a.isalpha() and word_b.isalpha()):
+            return False
+        if min(len(word_a), len(word_b)) < MIN_TYPO_WORD_LENGTH or not _within_one_edit(word_a, word_b):
+            return False
+    return True
+
+
+def shingles(text, size=3):
+    """Character n-grams of text, padded so short topics still produce shingles."""
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash_bands(shingle_set):
+    """Band hashes of the MinHash signature; similar sets share at least one band with high probability."""
+    hashes = [
+        struct.unpack(">Q", hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest())[0]
+        for s in shingle_set
+    ]
+    signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    return [
+        # Stored as signed 64-bit so it fits an SQLite INTEGER
+        struct.unpack(">q", hashlib.blake2b(repr(signature[band * ROWS:(band + 1) * ROWS]).encode(), digest_size=8).digest())[0]
+        for band in range(BANDS)
+    ]
+
+
+class TopicIndex(SQLiteStore):
+    """Maps user-typed topics onto canonical topics that have already been seen.
+
+    Topics are normalised, passed through the alias table, then matched
+    exactly or, failing that, by character-trigram similarity using a
+    MinHash LSH index stored in SQLite. Similar candidates are only merged
+    when their words are the same up to a typo (see same_words). Lookups touch a handful of indexed
+    rows, so they stay fast with hundreds of thousands of stored topics.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS topics (
+            canonical TEXT PRIMARY KEY,
+            display TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS topic_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            canonical TEXT NOT NULL,
+            PRIMARY KEY (band, bucket, canonical)
+        ) WITHOUT ROWID""",
+    )
+
+    def __init__(self, path=None, aliases=None, threshold=None):
+        super().__init__(path)
+        self.aliases = dict(DEFAULT_ALIASES)
+        aliases_path = os.environ.get("STUDY_TOPIC_ALIASES")
+        if aliases_path:
+            with open(aliases_path, encoding="utf-8") as f:
+                self.aliases.update(json.load(f))
+        self.aliases.update(aliases or {})
+        self.aliases = {normalize_topic(k): normalize_topic(v) for k, v in self.aliases.items()}
+        self.threshold = threshold if threshold is not None else float(
+            os.environ.get("STUDY_TOPIC_SIMILARITY", DEFAULT_SIMILARITY_THRESHOLD)
+        )
+
+    def canonicalize(self, topic):
+        """Return (canonical_key, display_topic) for topic, registering it if it is new."""
+        normalized = normalize_topic(topic)
+        if not normalized:
+            return "", topic.strip()
+        normalized = self.aliases.get(normalized, normalized)
+
+        match = self.lookup(normalized)
+        if match is not None:
+            return match
+
+        # Aliased topics display as their expansion rather than the abbreviation typed
+        display = normalized if normalized != normalize_topic(topic) else " ".join(topic.split())
+        self.register(normalized, display)
+        return normalized, display
+
+    def lookup(self, normalized):
+        """Return (canonical, display) of the stored topic matching a normalised topic, or None."""
+        conn = self._connection()
+        row = conn.execute("SELECT canonical, display FROM topics WHERE canonical = ?", (normalized,)).fetchone()
+        if row is not None:
+            return row
+
+        query_shingles = shingles(normalized)
+        bands = minhash_bands(query_shingles)
+        placeholders = " OR ".join("(band = ? AND bucket = ?)" for _ in bands)
+        params = [value for pair in enumerate(bands) for value in pair]
+        candidates = {
+            canonical
+            for (canonical,) in conn.execute(
+                f"SELECT DISTINCT canonical FROM topic_bands WHERE {placeholders}", params
+            )
+        }
+
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            score = jaccard(query_shingles, shingles(candidate))
+            if score >= best_score and same_words(normalized, candidate):
+                best, best_score = candidate, score
+        if best is None:
+            return None
+        return conn.execute("SELECT canonical, display FROM topics WHERE canonical = ?", (best,)).fetchone()
+
+    def register(self, canonical, display):
+        bands = minhash_bands(shingles(canonical))
+
+        def insert(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO topics (canonical, display, created_at) VALUES (?, ?, ?)",
+                (canonical, display, time.time()),
+            )
+            if cursor.rowcount:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO topic_bands (band, bucket, canonical) VALUES (?, ?, ?)",
+                    [(band, bucket, canonical) for band, bucket in enumerate(bands)],
+                )
+
+        self._transaction(insert)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_topic_index():
+    """Return the process-wide topic index shared by all generators."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = TopicIndex()
+        return _default_index
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the generation package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_question():
+    """Factory for valid, bankable quiz questions."""
+
+    def make(text, options=("Supervised", "Unsupervised", "Reinforcement", "Compilation"), correct=0):
+        return {"question": text, "options": list(options), "correct": correct, "explanation": "Because."}
+
+    return make
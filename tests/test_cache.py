@@ -0,0 +1,78 @@
+import time
+
+from generation.cache import DAY, ResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def _age(cache, key, seconds):
+    cache._connection().execute(
+        "UPDATE responses SET created_at = created_at - ?, accessed_at = accessed_at - ? WHERE key = ?",
+        (seconds, seconds, key),
+    )
+
+
+def _stored_bytes(cache):
+    (total,) = cache._connection().execute("SELECT value FROM cache_meta WHERE name = 'bytes'").fetchone()
+    return total
+
+
+def test_round_trip_and_missing_key(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("k", "content", {"text": "hello"})
+    assert cache.get("k") == {"text": "hello"}
+    assert cache.get("missing") is None
+
+
+def test_expired_entries_are_only_served_with_allow_stale(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("quiz", "quiz", ["question"])
+    cache.set("content", "content", "text")
+    _age(cache, "quiz", 8 * DAY)
+    _age(cache, "content", 8 * DAY)
+    assert cache.get("quiz") is None
+    assert cache.get("quiz", allow_stale=True) == ["question"]
+    assert cache.get("content") == "text"
+
+
+def test_bundles_expire_with_their_quiz(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("bundle", "bundle", {"quiz": []})
+    _age(cache, "bundle", 8 * DAY)
+    assert cache.get("bundle") is None
+
+
+def test_least_recently_used_entries_are_evicted_by_bytes(tmp_path):
+    cache = _cache(tmp_path, max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.set(key, "content", "x" * 78)
+        time.sleep(0.01)
+    # A hit on an entry whose access time is old enough moves it to the back of the LRU order
+    _age(cache, "a", 3600)
+    assert cache.get("a") is not None
+    _age(cache, "b", 3600)
+    cache.set("d", "content", "x" * 78)
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_running_total_tracks_writes_replacements_and_deletes(tmp_path):
+    cache = _cache(tmp_path, max_bytes=10_000)
+    cache.set("a", "content", "x" * 98)
+    cache.set("b", "content", "y" * 48)
+    cache.set("a", "content", "z" * 18)
+    assert _stored_bytes(cache) == cache.stats()["bytes"] == 70
+    cache.delete("b")
+    assert _stored_bytes(cache) == cache.stats()["bytes"] == 20
+    cache.clear()
+    assert _stored_bytes(cache) == 0
+
+
+def test_running_total_is_initialised_from_existing_entries(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("a", "content", "x" * 98)
+    cache._connection().execute("DELETE FROM cache_meta")
+    assert _stored_bytes(_cache(tmp_path)) == 100
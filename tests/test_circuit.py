@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from generation.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _breaker(**kwargs):
+    kwargs.setdefault("min_calls", 4)
+    kwargs.setdefault("open_seconds", 0.05)
+    return CircuitBreaker(**kwargs)
+
+
+def _open(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls_and_failure_rate():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_failures_open_the_circuit_and_calls_fail_fast():
+    breaker = _breaker()
+    _open(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = _breaker(slow_call_seconds=1.0)
+    for _ in range(4):
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_one_probe_and_success_closes():
+    breaker = _breaker()
+    _open(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_opens_again():
+    breaker = _breaker()
+    _open(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_release_frees_the_probe_slot():
+    breaker = _breaker()
+    _open(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
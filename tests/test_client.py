@@ -0,0 +1,67 @@
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from generation.client import GroqClient, _parse_duration
+from generation.mock_backend import MockAPIError
+from generation.rate_limit import RateLimiter
+
+
+def _error(status_code, headers):
+    return SimpleNamespace(status_code=status_code, response=SimpleNamespace(headers=headers))
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("1m30.5s", 90.5),
+    ("7.66s", 7.66),
+    ("250ms", 0.25),
+    ("1h", 3600),
+])
+def test_parse_duration(value, seconds):
+    assert _parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", ["", None, "soon"])
+def test_parse_duration_rejects_garbage(value):
+    assert _parse_duration(value) is None
+
+
+def test_retry_after_ms_takes_precedence():
+    assert GroqClient._server_retry_after(_error(503, {"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+
+
+def test_retry_after_seconds():
+    assert GroqClient._server_retry_after(_error(503, {"retry-after": "2"})) == 2.0
+
+
+def test_retry_after_http_date():
+    header = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert GroqClient._server_retry_after(_error(503, {"retry-after": header})) == pytest.approx(30, abs=2)
+
+
+def test_retry_after_garbage_is_ignored():
+    assert GroqClient._server_retry_after(_error(503, {"retry-after": "soon"})) is None
+    assert GroqClient._server_retry_after(_error(503, {"retry-after-ms": "soon"})) is None
+
+
+def test_rate_limit_reset_headers_on_429():
+    headers = {"x-ratelimit-reset-requests": "1m30.5s", "x-ratelimit-reset-tokens": "7.66s"}
+    assert GroqClient._server_retry_after(_error(429, headers)) == pytest.approx(90.5)
+    assert GroqClient._server_retry_after(_error(503, headers)) is None
+
+
+def test_garbage_retry_after_still_retries_the_api_error(tmp_path):
+    calls = []
+
+    def create(**params):
+        calls.append(params)
+        raise MockAPIError("Service unavailable", 503, {"retry-after": "soon"})
+
+    backend = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    client = GroqClient(client=backend, max_retries=2, backoff_base=0.001, backoff_max=0.01,
+                        limiter=RateLimiter(path=str(tmp_path / "limits.sqlite3")))
+    with pytest.raises(MockAPIError):
+        client.create(messages=[{"role": "user", "content": "hi"}], model="m")
+    assert len(calls) == 3
@@ -0,0 +1,44 @@
+import pytest
+
+from generation import metrics
+from generation.course_pack import CoursePackError, CoursePackExporter
+
+
+class _FakePipeline:
+    """Returns fixed sections, falling back or raising for the topics named."""
+
+    def __init__(self, fallback=(), broken=()):
+        self.fallback = fallback
+        self.broken = broken
+
+    def generate_all(self, topic, level, include_examples=True, include_quiz=True):
+        if topic in self.broken:
+            raise KeyError(topic)
+        if topic in self.fallback:
+            metrics.record("fallback", kind="content", topic=topic, level=level, error="Groq is down")
+        return {"content": f"About {topic}", "examples": "", "quiz": []}
+
+
+ENTRIES = [("Photosynthesis", "Beginner"), ("Gravity", "Advanced")]
+
+
+def test_markdown_pack_contains_every_topic(tmp_path):
+    path = tmp_path / "pack.md"
+    CoursePackExporter(_FakePipeline(), concurrency=2).export(ENTRIES, "Science", markdown_path=str(path))
+    text = path.read_text(encoding="utf-8")
+    assert "# Science" in text
+    assert "## 1. Photosynthesis (Beginner)" in text and "About Gravity" in text
+
+
+def test_fallback_content_fails_the_export(tmp_path):
+    path = tmp_path / "pack.md"
+    with pytest.raises(CoursePackError, match="Gravity \\(Advanced\\): fell back to placeholder content for content"):
+        CoursePackExporter(_FakePipeline(fallback={"Gravity"})).export(ENTRIES, markdown_path=str(path))
+    assert not path.exists()
+
+
+def test_worker_exceptions_are_reported(tmp_path):
+    path = tmp_path / "pack.md"
+    with pytest.raises(CoursePackError, match="1 of 2 topics failed"):
+        CoursePackExporter(_FakePipeline(broken={"Photosynthesis"})).export(ENTRIES, markdown_path=str(path))
+    assert not path.exists()
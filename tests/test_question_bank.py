@@ -0,0 +1,40 @@
+from generation.question_bank import QuestionBank
+
+
+def _bank(tmp_path):
+    return QuestionBank(str(tmp_path / "bank.sqlite3"))
+
+
+def test_negated_question_is_not_a_duplicate(tmp_path, make_question):
+    bank = _bank(tmp_path)
+    added = bank.add("machine learning", "Beginner", [
+        make_question("Which of these is a type of machine learning?"),
+        make_question("Which of these is NOT a type of machine learning?"),
+    ])
+    assert added == 2
+    assert bank.count("machine learning", "Beginner") == 2
+
+
+def test_spelling_and_punctuation_variants_are_duplicates(tmp_path, make_question):
+    bank = _bank(tmp_path)
+    assert bank.add("machine learning", "Beginner", [make_question("Which of these is a type of machine learning?")]) == 1
+    assert bank.add("machine learning", "Beginner", [
+        make_question("Which of these is a type of machine learning"),
+        make_question("Which of these is a type of machine lerning?"),
+    ]) == 0
+    assert bank.count("machine learning", "Beginner") == 1
+
+
+def test_duplicates_are_checked_per_topic_and_level(tmp_path, make_question):
+    bank = _bank(tmp_path)
+    question = make_question("Which of these is a type of machine learning?")
+    assert bank.add("machine learning", "Beginner", [question]) == 1
+    assert bank.add("machine learning", "Advanced", [question]) == 1
+    assert bank.add("deep learning", "Beginner", [question]) == 1
+
+
+def test_unbankable_questions_are_skipped(tmp_path, make_question):
+    bank = _bank(tmp_path)
+    repeated_options = make_question("Which option repeats?", ("A", "A", "B", "C"))
+    three_options = make_question("Which has three options?", ("A", "B", "C"))
+    assert bank.add("machine learning", "Beginner", [repeated_options, three_options]) == 0
@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from generation.cache import ResponseCache
+from generation.question_bank import QuestionBank
+from generation.quize_generator import QUESTIONS_PER_QUIZ, QuizGenerator, QuizStreamParser
+from generation.singleflight import SingleFlight
+from generation.topics import TopicIndex
+
+
+def _feed_in_chunks(parser, text, size=7):
+    questions = []
+    for start in range(0, len(text), size):
+        questions.extend(parser.feed(text[start:start + size]))
+    return questions
+
+
+def test_bare_array_yields_each_question_once_complete(make_question):
+    parser = QuizStreamParser()
+    text = "Here are the questions:\n" + json.dumps([make_question("First?"), make_question("Second?", correct=2)])
+    questions = _feed_in_chunks(parser, text)
+    assert [q["question"] for q in questions] == ["First?", "Second?"]
+    assert questions[1]["correct"] == 2
+    assert parser.invalid == 0
+
+
+def test_question_is_returned_by_the_chunk_that_closes_it(make_question):
+    parser = QuizStreamParser()
+    text = json.dumps([make_question("First?"), make_question("Second?")])
+    end_of_first = text.index("}") + 1
+    assert parser.feed(text[:end_of_first - 1]) == []
+    assert [q["question"] for q in parser.feed(text[end_of_first - 1:end_of_first])] == ["First?"]
+
+
+def test_json_mode_wrapper_is_not_taken_for_a_question(make_question):
+    parser = QuizStreamParser()
+    text = json.dumps({"questions": [make_question("First?"), make_question("Second?")]})
+    questions = _feed_in_chunks(parser, text)
+    assert [q["question"] for q in questions] == ["First?", "Second?"]
+
+
+def test_braces_and_escaped_quotes_inside_strings(make_question):
+    parser = QuizStreamParser()
+    question = make_question('Which "dict" literal is {empty}?')
+    question["explanation"] = 'A \\"brace\\" like } closes nothing here'
+    questions = _feed_in_chunks(parser, json.dumps([question]), size=3)
+    assert questions == [question]
+
+
+def test_truncated_response_keeps_complete_questions(make_question):
+    parser = QuizStreamParser()
+    text = json.dumps([make_question("First?"), make_question("Second?")])
+    questions = parser.feed(text[:-20])
+    assert [q["question"] for q in questions] == ["First?"]
+
+
+def test_invalid_questions_are_counted_and_skipped(make_question):
+    parser = QuizStreamParser()
+    bad = {"question": "Out of range?", "options": ["A", "B"], "correct": 5}
+    questions = parser.feed(json.dumps([bad, make_question("Good?")]))
+    assert [q["question"] for q in questions] == ["Good?"]
+    assert parser.invalid == 1
+
+
+def test_parse_quiz_raises_without_questions():
+    with pytest.raises(ValueError):
+        QuizGenerator._parse_quiz("Sorry, I cannot help with that.")
+    with pytest.raises(ValueError):
+        QuizGenerator._parse_quiz('[{"question": "Cut off')
+
+
+class _ScriptedClient:
+    """Returns the given response texts in order, one per create() call."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        message = SimpleNamespace(content=self.responses.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+def _quiz_generator(tmp_path, client):
+    path = str(tmp_path / "quiz.sqlite3")
+    return QuizGenerator(
+        client=client,
+        cache=ResponseCache(path),
+        flight=SingleFlight(path),
+        topics=TopicIndex(path),
+        bank=QuestionBank(path),
+    )
+
+
+def test_partial_quiz_is_served_but_not_cached(tmp_path, make_question):
+    client = _ScriptedClient(json.dumps({"questions": [make_question("Only one?")]}), "No JSON this time")
+    generator = _quiz_generator(tmp_path, client)
+    quiz = generator.generate_quiz("Photosynthesis", "Beginner")
+    assert [q["question"] for q in quiz] == ["Only one?"]
+    assert client.calls == 2
+    key = generator._resolve("Photosynthesis", "Beginner")[0]
+    assert generator.cache.get(key) is None
+
+
+def test_complete_quiz_is_cached(tmp_path, make_question):
+    questions = [make_question(f"Question {i} about leaves?") for i in range(QUESTIONS_PER_QUIZ)]
+    client = _ScriptedClient(json.dumps({"questions": questions}))
+    generator = _quiz_generator(tmp_path, client)
+    assert generator.generate_quiz("Photosynthesis", "Beginner") == questions
+    key = generator._resolve("Photosynthesis", "Beginner")[0]
+    assert generator.cache.get(key) == questions
@@ -0,0 +1,75 @@
+import pytest
+
+from generation.rate_limit import BACKGROUND, BATCH, INTERACTIVE, RateLimiter, RateLimitExceeded, priority
+
+
+def _limiter(tmp_path, **kwargs):
+    kwargs.setdefault("headroom", 1.0)
+    return RateLimiter(path=str(tmp_path / "limits.sqlite3"), **kwargs)
+
+
+def _level(limiter, name):
+    (level,) = limiter._connection().execute("SELECT level FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+    return level
+
+
+def test_no_budget_never_limits(tmp_path):
+    limiter = _limiter(tmp_path)
+    for _ in range(100):
+        limiter.acquire(10_000, BACKGROUND)
+
+
+def test_background_is_shed_before_dipping_into_the_reserve(tmp_path):
+    limiter = _limiter(tmp_path, rpm=4)
+    limiter.acquire(0, BACKGROUND)
+    limiter.acquire(0, BACKGROUND)
+    # Half of the bucket is kept for more important traffic, and background work never waits
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(0, BACKGROUND)
+    limiter.acquire(0, INTERACTIVE)
+    limiter.acquire(0, INTERACTIVE)
+
+
+def test_interactive_is_shed_when_capacity_is_too_far_off(tmp_path):
+    limiter = _limiter(tmp_path, rpm=4)
+    for _ in range(4):
+        limiter.acquire(0, INTERACTIVE)
+    # One request refills in 15s, longer than interactive requests may wait
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(0, INTERACTIVE)
+
+
+def test_priority_context_sets_the_default_level(tmp_path):
+    limiter = _limiter(tmp_path, rpm=4)
+    with priority(BACKGROUND):
+        limiter.acquire(0)
+        limiter.acquire(0)
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire(0)
+    with priority(BATCH):
+        # Batch keeps a quarter in reserve, so one of the two remaining requests is available
+        limiter.acquire(0)
+
+
+def test_buckets_are_shared_through_the_database(tmp_path):
+    first, second = _limiter(tmp_path, rpm=4), _limiter(tmp_path, rpm=4)
+    first.acquire(0, INTERACTIVE)
+    first.acquire(0, INTERACTIVE)
+    second.acquire(0, INTERACTIVE)
+    assert _level(second, "requests") == pytest.approx(1, abs=0.01)
+
+
+def test_reconcile_returns_unused_tokens(tmp_path):
+    limiter = _limiter(tmp_path, tpm=6000)
+    limiter.acquire(1000, INTERACTIVE)
+    assert _level(limiter, "tokens") == pytest.approx(5000)
+    limiter.reconcile(1000, 200)
+    assert _level(limiter, "tokens") == pytest.approx(5800)
+    limiter.reconcile(1000, None)
+    assert _level(limiter, "tokens") == pytest.approx(5800)
+
+
+def test_oversized_requests_only_need_a_full_bucket(tmp_path):
+    limiter = _limiter(tmp_path, tpm=600)
+    limiter.acquire(5000, INTERACTIVE)
+    assert _level(limiter, "tokens") == pytest.approx(0)
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from generation.cache import ResponseCache
+from generation.content_generator import ContentGenerator
+from generation.metrics import REGISTRY
+from generation.routing import DEFAULT_MODEL, Route, RoutingPolicy
+from generation.singleflight import SingleFlight
+from generation.topics import TopicIndex
+
+
+class _EchoClient:
+    """Answers every request with the model it was sent to."""
+
+    def __init__(self):
+        self.models = []
+
+    def create(self, model, **params):
+        self.models.append(model)
+        message = SimpleNamespace(content=f"Answer from {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+def _generator(tmp_path, routes):
+    path = str(tmp_path / "routing.sqlite3")
+    return ContentGenerator(
+        client=_EchoClient(), cache=ResponseCache(path), flight=SingleFlight(path), topics=TopicIndex(path), routes=routes,
+    )
+
+
+def _slow_policy(model):
+    for _ in range(10):
+        REGISTRY.observe("groq_completion_seconds", 5.0, model=model)
+    return RoutingPolicy(routes={"content": {"Advanced": {"model": model}}}, slo={"p95_seconds": 1.0})
+
+
+def test_slo_moves_slow_models_to_the_fast_model():
+    policy = _slow_policy("slow-model-a")
+    assert policy.configured("content", "Advanced").model == "slow-model-a"
+    assert policy.route("content", "Advanced").model == DEFAULT_MODEL
+    assert policy.route("content", "Beginner").model == DEFAULT_MODEL
+
+
+def test_length_hint_follows_max_tokens():
+    policy = RoutingPolicy(routes={"content": {"Beginner": {"max_tokens": 500}}})
+    assert "300 words" in policy.configured("content", "Beginner").length_hint()
+    assert Route(DEFAULT_MODEL, None, None).length_hint() == ""
+
+
+def test_downgraded_answers_are_served_but_not_cached(tmp_path):
+    generator = _generator(tmp_path, _slow_policy("slow-model-b"))
+    assert generator.generate_content("Topic", "Advanced") == f"Answer from {DEFAULT_MODEL}"
+    assert generator.cache.get(generator._resolve("Topic", "Advanced")[0]) is None
+
+
+def test_configured_answers_are_cached(tmp_path):
+    generator = _generator(tmp_path, RoutingPolicy(routes={"content": {"Advanced": {"model": "slow-model-c"}}}))
+    assert generator.generate_content("Topic", "Advanced") == "Answer from slow-model-c"
+    assert generator.cache.get(generator._resolve("Topic", "Advanced")[0]) == "Answer from slow-model-c"
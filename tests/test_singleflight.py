@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from generation.singleflight import SingleFlight
+
+
+def _flight(tmp_path, **kwargs):
+    kwargs.setdefault("poll_interval", 0.01)
+    return SingleFlight(str(tmp_path / "flight.sqlite3"), **kwargs)
+
+
+def _start(target, *args):
+    results = {}
+
+    def run():
+        try:
+            results["value"] = target(*args)
+        except Exception as e:
+            results["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+def _wait_for_flight(flight, key):
+    while key not in flight._flights:
+        time.sleep(0.001)
+
+
+def test_followers_share_the_leaders_value(tmp_path):
+    flight = _flight(tmp_path)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    leader, leader_result = _start(flight.do, "key", compute)
+    _wait_for_flight(flight, "key")
+    follower, follower_result = _start(flight.do, "key", compute)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert leader_result == follower_result == {"value": "value"}
+    assert len(calls) == 1
+
+
+def test_leader_error_reaches_followers(tmp_path):
+    flight = _flight(tmp_path)
+    release = threading.Event()
+    error = RuntimeError("Groq is down")
+
+    def compute():
+        release.wait(5)
+        raise error
+
+    leader, leader_result = _start(flight.do, "key", compute)
+    _wait_for_flight(flight, "key")
+    follower, follower_result = _start(flight.do, "key", lambda: "never called")
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert leader_result["error"] is error
+    assert follower_result["error"] is error
+    # The flight is gone, so the next call runs again
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_other_process_result_is_picked_up_through_lookup(tmp_path):
+    leader_process, other_process = _flight(tmp_path), _flight(tmp_path)
+    flight, leader = leader_process.acquire("key")
+    assert leader
+    stored = {}
+    waiter, waiter_result = _start(other_process.do, "key", lambda: "computed twice", lambda: stored.get("key"))
+    time.sleep(0.05)
+    stored["key"] = "value"
+    leader_process.finish("key", flight, value="value")
+    waiter.join(5)
+    assert waiter_result == {"value": "value"}
+
+
+def test_expired_lease_lets_another_process_lead(tmp_path):
+    crashed = _flight(tmp_path, lease_seconds=0.1)
+    crashed.acquire("key")
+    # The holder never finishes, as if its process died
+    other = _flight(tmp_path)
+    started = time.monotonic()
+    flight, leader = other.acquire("key", lambda: None)
+    assert leader
+    assert time.monotonic() - started >= 0.09
+    other.finish("key", flight, value="value")
+
+
+def test_released_lease_is_free_immediately(tmp_path):
+    first, second = _flight(tmp_path), _flight(tmp_path)
+    flight, _ = first.acquire("key")
+    first.finish("key", flight, value="value")
+    _, leader = second.acquire("key")
+    assert leader
+
+
+def test_follower_timeout(tmp_path):
+    flight = _flight(tmp_path)
+    held, _ = flight.acquire("key")
+    with pytest.raises(TimeoutError):
+        held.wait(0.01)
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+from generation import startup
+
+
+def _streamlit_importable():
+    # Checked in a subprocess so a broken streamlit install cannot break this interpreter
+    proc = subprocess.run([sys.executable, "-c", "import streamlit.testing.v1"], capture_output=True)
+    return proc.returncode == 0
+
+
+def test_app_imports_defer_heavy_dependencies():
+    result = startup.profile_imports()
+    assert result["loaded"] == []
+    assert result["seconds"] <= startup.DEFAULT_IMPORT_BUDGET
+
+
+@pytest.mark.skipif(not _streamlit_importable(), reason="streamlit cannot be imported")
+def test_cold_start_within_budget():
+    result = startup.profile()
+    assert result["exceptions"] == []
+    assert result["cold_start"] <= startup.DEFAULT_COLD_START_BUDGET
+    assert result["first_render"] <= startup.DEFAULT_RENDER_BUDGET
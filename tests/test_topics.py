@@ -0,0 +1,50 @@
+import pytest
+
+from generation.topics import TopicIndex, normalize_text, normalize_topic, same_words
+
+
+@pytest.mark.parametrize("a, b", [
+    ("machine learning", "machine learning"),
+    ("machine learning", "machine lerning"),
+    ("photosynthesis", "photosynthesiss"),
+    ("neural networks", "nueral networks"),
+])
+def test_same_words_accepts_typos_in_long_words(a, b):
+    assert same_words(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("supervised learning", "unsupervised learning"),
+    ("organic chemistry", "inorganic chemistry"),
+    ("python 2", "python 3"),
+    ("c++", "c#"),
+    ("c", "c++"),
+    ("cell", "cells"),
+    ("machine learning", "machine learning basics"),
+])
+def test_same_words_rejects_different_topics(a, b):
+    assert not same_words(a, b)
+
+
+def test_normalize_topic_keeps_plus_and_hash():
+    assert normalize_topic(" C++ ") == "c++"
+    assert normalize_topic("C#") == "c#"
+    assert normalize_topic("Machine-Learning!") == "machine learning"
+
+
+def test_normalize_text_folds_case_unicode_and_punctuation():
+    assert normalize_text("  Which is NOT a\u00a0type of ML?  ") == "which is not a type of ml"
+    assert normalize_text("What does C++ add to C#?") == "what does c++ add to c#"
+
+
+def test_canonicalize_keeps_similar_topics_apart(tmp_path):
+    index = TopicIndex(str(tmp_path / "topics.sqlite3"), aliases={})
+    keys = [index.canonicalize(topic)[0] for topic in ("C", "C++", "C#", "Supervised Learning", "Unsupervised Learning")]
+    assert len(set(keys)) == len(keys)
+
+
+def test_canonicalize_merges_spelling_variants(tmp_path):
+    index = TopicIndex(str(tmp_path / "topics.sqlite3"), aliases={})
+    canonical, display = index.canonicalize("Introduction to Machine Learning Algorithms")
+    assert index.canonicalize("introduction to machine-learning algorithms!")[0] == canonical
+    assert index.canonicalize("Introduction to Machine Lerning Algorithms") == (canonical, display)